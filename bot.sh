@@ -1,7 +1,15 @@
 #!/bin/bash
 
 stop_bot () {
-	ps -ef | grep "src/ZWTelegramBot.py" | grep -v grep | awk '{print $2}' | xargs -r kill
+	# SIGTERM: the bot stops polling, finishes the running updates and jobs, then exits
+	pids=$(ps -ef | grep "src/ZWTelegramBot.py" | grep -v grep | awk '{print $2}')
+	[ -z "$pids" ] && return
+	kill $pids
+	for i in $(seq 1 30); do
+		kill -0 $pids 2>/dev/null || return
+		sleep 1
+	done
+	kill -9 $pids 2>/dev/null
 }
 
 start_bot () {
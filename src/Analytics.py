@@ -0,0 +1,201 @@
+import logging
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    # optional dependency, only needed for /analytics
+    np = None
+
+from DatabaseHandler import DatabaseHandler
+
+UNSURE = 0
+YES = 1
+NO = 2
+
+
+def longest_and_current_streaks(attended):
+    """length of the longest and of the current run of True per column, vectorized over all columns
+
+    Args:
+        attended (np.ndarray): bool matrix games x players, games in chronological order
+
+    Returns:
+        (np.ndarray, np.ndarray): longest and current streak per player
+    """
+
+    if attended.shape[0] == 0:
+        zeros = np.zeros(attended.shape[1], dtype=np.int64)
+        return zeros, zeros
+    count = np.cumsum(attended, axis=0)
+    # count at the last game missed, carried forward: the streak is the count since then
+    count_at_last_miss = np.maximum.accumulate(np.where(attended, 0, count), axis=0)
+    streaks = count - count_at_last_miss
+    return streaks.max(axis=0), streaks[-1]
+
+
+def grouped_mean(keys: list, values):
+    """mean of values per distinct key
+
+    Args:
+        keys (list): group key per value (e.g. the adversary of each game)
+        values (np.ndarray): value per key (e.g. the number of players with YES)
+
+    Returns:
+        [(str, float, int)]: (key, mean, number of values), ordered by mean descending
+    """
+
+    if len(keys) == 0:
+        return []
+    (groups, inverse) = np.unique(np.asarray(keys, dtype=object).astype(str), return_inverse=True)
+    sizes = np.bincount(inverse)
+    means = np.bincount(inverse, weights=values) / sizes
+    order = np.argsort(-means, kind='stable')
+    return [(groups[i], float(means[i]), int(sizes[i])) for i in order]
+
+
+def compute_analytics(player_list: list, rows: list, lead_times: list):
+    """compute the attendance aggregates over all past games
+
+    Args:
+        player_list (list): chat_ids of the player columns
+        rows (list): rows (ID, DateTime, Place, Adversary, p..., p...), ordered by DateTime
+        lead_times (list): rows (PlayerID, hours before the game of the first YES / NO)
+
+    Returns:
+        dict: aggregates per player (rates, streaks, median lead time) and turnout per adversary / place
+    """
+
+    player_count = len(player_list)
+    status = np.array([row[4:] for row in rows], dtype=np.int8).reshape(len(rows), player_count)
+    attended = status == YES
+    answered = status != UNSURE
+    game_count = status.shape[0]
+    # games before the first answer of a player (e.g. before the player joined) are not counted as missed
+    first_answer = np.where(answered.any(axis=0), answered.argmax(axis=0), game_count)
+    games_per_player = game_count - first_answer
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        attendance_rate = attended.sum(axis=0) / games_per_player
+        answer_rate = answered.sum(axis=0) / games_per_player
+    (longest_streak, current_streak) = longest_and_current_streaks(attended)
+
+    # median lead time per player: sort by player, split into groups
+    median_lead_time = np.full(player_count, np.nan)
+    if len(lead_times) > 0:
+        lead_players = np.array([player for (player, hours) in lead_times], dtype=np.int64)
+        lead_hours = np.array([float(hours) for (player, hours) in lead_times])
+        column_of_player = {player: column for column, player in enumerate(player_list)}
+        known = np.array([player in column_of_player for player in lead_players], dtype=bool)
+        columns = np.array([column_of_player.get(player, -1) for player in lead_players], dtype=np.int64)[known]
+        lead_hours = lead_hours[known]
+        order = np.lexsort((lead_hours, columns))
+        (unique_columns, starts) = np.unique(columns[order], return_index=True)
+        for column, hours in zip(unique_columns, np.split(lead_hours[order], starts[1:])):
+            median_lead_time[column] = np.median(hours)
+
+    turnout = attended.sum(axis=1).astype(float)
+    return {
+        'game_count': game_count,
+        'players': player_list,
+        'attendance_rate': attendance_rate,
+        'answer_rate': answer_rate,
+        'longest_streak': longest_streak,
+        'current_streak': current_streak,
+        'median_lead_time': median_lead_time,
+        'adversary_turnout': grouped_mean([row[3] for row in rows], turnout),
+        'place_turnout': grouped_mean([row[2] for row in rows], turnout),
+    }
+
+
+class AnalyticsHandler(object):
+    def __init__(self, db_handler: DatabaseHandler, _logger: logging.Logger):
+        """attendance analytics over all seasons (Games and GamesArchive), cached until the games data changes
+
+        Args:
+            db_handler (DatabaseHandler): DataBase Handler-instance
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        self.database_handler = db_handler
+        self.logger = _logger
+        # ((data_version, number of past games), analytics) of the last computation
+        self.cache = (None, None)
+        self.lock = threading.Lock()
+
+    def is_available(self):
+        """return whether numpy is installed
+
+        Returns:
+            bool: analytics available?
+        """
+
+        return np is not None
+
+    def get_analytics(self):
+        """get the analytics, recomputed only if DataBase.Games changed or games became past games since the last call
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            dict: see compute_analytics
+        """
+
+        with self.lock:
+            # games turn into past games without a write to DataBase.Games
+            cache_key = (self.database_handler.data_version, self.database_handler.get_past_game_count())
+            if self.cache[0] == cache_key:
+                return self.cache[1]
+            (player_list, rows) = self.database_handler.get_attendance_history()
+            lead_times = self.database_handler.get_response_lead_times()
+            analytics = compute_analytics(player_list, rows, lead_times)
+            self.cache = (cache_key, analytics)
+            self.logger.info(f"computed analytics over {analytics['game_count']} games")
+            return analytics
+
+    def get_report(self, top: int = 5):
+        """render the analytics as plain text
+
+        Args:
+            top (int, optional): number of adversaries and places listed. Defaults to 5.
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            str: the report
+        """
+
+        if not self.is_available():
+            return 'Analytics not available: numpy is not installed'
+        analytics = self.get_analytics()
+        if analytics['game_count'] == 0:
+            return 'No past games to analyze yet'
+
+        player_chat_id_dict = self.database_handler.player_chat_id_dict
+        report = f"Attendance over {analytics['game_count']} past games\n" \
+                 f"(yes rate / answered rate since the first answer / longest streak (current) / " \
+                 f"median answer before game)\n\n"
+        order = np.argsort(-np.nan_to_num(analytics['attendance_rate']), kind='stable')
+        for column in order:
+            player = analytics['players'][column]
+            # names are escaped for MarkdownV2, the report is plain text
+            name = player_chat_id_dict.get(player, (str(player), False))[0].replace('\\', '')
+            lead_time = analytics['median_lead_time'][column]
+            pretty_lead_time = '-' if np.isnan(lead_time) else f"{lead_time / 24:.1f}d"
+            if np.isnan(analytics['attendance_rate'][column]):
+                # never answered
+                report += f"{name}: no answers yet\n"
+                continue
+            report += f"{name}: {analytics['attendance_rate'][column]:.0%} / {analytics['answer_rate'][column]:.0%} / " \
+                      f"{analytics['longest_streak'][column]} ({analytics['current_streak'][column]}) / " \
+                      f"{pretty_lead_time}\n"
+
+        report += "\nAverage turnout (YES) per adversary:\n"
+        for (adversary, mean, count) in analytics['adversary_turnout'][:top]:
+            report += f"{adversary}: {mean:.1f} ({count} games)\n"
+        report += "\nAverage turnout (YES) per place:\n"
+        for (place, mean, count) in analytics['place_turnout'][:top]:
+            report += f"{place}: {mean:.1f} ({count} games)\n"
+        return report
@@ -0,0 +1,216 @@
+import configparser
+import datetime
+import hashlib
+import hmac
+import logging
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import utility as util
+from DatabaseHandler import DatabaseHandler
+from exceptions import NotifyUserException
+
+# token of the team-wide feed is derived from this name instead of a chat_id
+TEAM_FEED = 'team'
+
+
+class CalendarFeedHandler(object):
+    def __init__(self, config: configparser.RawConfigParser, secret: str, db_handler: DatabaseHandler,
+                 _logger: logging.Logger):
+        """ics-feeds of the games: one for the team, one per player with the attendance of the player
+        served on GET /calendar/<token>.ics, the token is derived from the chat_id with a secret (hmac), so the urls
+        can not be guessed; rendered feeds are cached until DataBase.Games changes (ETag from data_version)
+
+        Args:
+            config (configparser.RawConfigParser): configuration file, section Calendar
+            secret (str): secret to derive the tokens from
+            db_handler (DatabaseHandler): DataBase Handler-instance
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        self.database_handler = db_handler
+        self.logger = _logger
+        self.secret = secret.encode()
+        self.enabled = config['Calendar'].getboolean('enabled', False)
+        self.host = config['Calendar'].get('host', '127.0.0.1')
+        self.port = config['Calendar'].getint('port', 8322)
+        # public url of the server (e.g. behind a reverse proxy), the feed urls sent to the players start with it
+        self.base_url = config['Calendar'].get('base_url', f"http://{self.host}:{self.port}").rstrip('/')
+        self.game_duration = datetime.timedelta(minutes=config['Calendar'].getint('game_duration_minutes', 120))
+        # calendar clients should not poll more often than this
+        self.max_age = config['Calendar'].getint('max_age', 300)
+        # data_version starts at 0 with every start of the bot, the ETag must not repeat across restarts
+        self.instance = uuid.uuid4().hex[:8]
+        # token -> chat_id (or TEAM_FEED), rebuilt when the roster changes
+        self.tokens = dict()
+        # token -> (data_version, ETag, rendered feed)
+        self.cache = dict()
+        self.lock = threading.Lock()
+        self.server = None
+
+    def is_enabled(self):
+        """return whether the feeds are served
+
+        Returns:
+            bool: feeds enabled?
+        """
+
+        return self.enabled
+
+    def get_token(self, owner):
+        """get the token of a feed
+
+        Args:
+            owner (int or str): chat_id of the player, TEAM_FEED for the team feed
+
+        Returns:
+            str: the token
+        """
+
+        return hmac.new(self.secret, f"calendar|{owner}".encode(), hashlib.sha256).hexdigest()[:32]
+
+    def get_url(self, owner):
+        """get the url of a feed
+
+        Args:
+            owner (int or str): chat_id of the player, TEAM_FEED for the team feed
+
+        Returns:
+            str: the url to subscribe to
+        """
+
+        return f"{self.base_url}/calendar/{self.get_token(owner)}.ics"
+
+    def resolve_token(self, token: str):
+        """get the owner of a feed from its token
+
+        Args:
+            token (str): the token of the url
+
+        Returns:
+            int or str: chat_id of the player, TEAM_FEED or None if the token is unknown
+        """
+
+        with self.lock:
+            players = self.database_handler.identities.players
+            if len(self.tokens) != len(players) + 1:
+                self.tokens = {self.get_token(chat_id): chat_id for chat_id in list(players)}
+                self.tokens[self.get_token(TEAM_FEED)] = TEAM_FEED
+            return self.tokens.get(token)
+
+    def get_feed(self, token: str):
+        """get the rendered feed of a token, rendered again only if DataBase.Games changed
+
+        Args:
+            token (str): the token of the url
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            (str, bytes): ETag and the ics-feed, None if the token is unknown
+        """
+
+        owner = self.resolve_token(token)
+        if owner is None:
+            return None
+        data_version = self.database_handler.data_version
+        with self.lock:
+            cached = self.cache.get(token)
+        if cached is not None and cached[0] == data_version:
+            return cached[1], cached[2]
+        feed = self.render(owner)
+        etag = f'"{self.instance}-{data_version}"'
+        with self.lock:
+            self.cache[token] = (data_version, etag, feed)
+        return etag, feed
+
+    def render(self, owner):
+        """render the ics-feed of the games (not archived yet), for a player with the attendance in the title
+
+        Args:
+            owner (int or str): chat_id of the player, TEAM_FEED for the team feed
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            bytes: the ics-feed
+        """
+
+        # loaded with the first feed requested, not at startup
+        import icalendar
+
+        chat_id = None if owner == TEAM_FEED else owner
+        calendar = icalendar.Calendar()
+        calendar.add('prodid', '-//ZW Date Bot//Games//EN')
+        calendar.add('version', '2.0')
+        calendar.add('x-wr-calname', 'Züri West games')
+        for (ID, DateTime, Place, Adversary, status) in self.database_handler.get_calendar_games(chat_id):
+            event = icalendar.Event()
+            event.add('uid', f"game-{ID}@zw-date-bot")
+            event.add('dtstart', DateTime)
+            event.add('dtend', DateTime + self.game_duration)
+            event.add('dtstamp', datetime.datetime.now())
+            title = f"Game vs {Adversary}"
+            if status is not None:
+                title = f"[{util.translate_status_from_int(status)}] {title}"
+            event.add('summary', title)
+            event.add('location', Place)
+            calendar.add_component(event)
+        return calendar.to_ical()
+
+    def start(self):
+        """serve the feeds in background threads
+        """
+
+        feed_handler = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if not (path.startswith('/calendar/') and path.endswith('.ics')):
+                    self.send_error(404)
+                    return
+                try:
+                    result = feed_handler.get_feed(path[len('/calendar/'):-len('.ics')])
+                except NotifyUserException:
+                    feed_handler.logger.error("rendering calendar feed failed", exc_info=True)
+                    self.send_error(503)
+                    return
+                if result is None:
+                    self.send_error(404)
+                    return
+                (etag, feed) = result
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/calendar; charset=utf-8')
+                self.send_header('Content-Length', str(len(feed)))
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', f"max-age={feed_handler.max_age}")
+                self.end_headers()
+                self.wfile.write(feed)
+
+            def log_message(self, format, *args):
+                # polled by every subscribed calendar, keep it out of the log
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), RequestHandler)
+        except OSError:
+            self.logger.error(f"calendar feeds not served, port {self.port} not available", exc_info=True)
+            return
+        threading.Thread(target=self.server.serve_forever, name='CalendarServer', daemon=True).start()
+        self.logger.info(f"Calendar feeds served on {self.host}:{self.port}")
+
+    def stop(self):
+        """stop serving the feeds
+        """
+
+        if self.server is not None:
+            self.server.shutdown()
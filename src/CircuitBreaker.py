@@ -0,0 +1,87 @@
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitBreaker(object):
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        """fail fast while a resource (the database) is down instead of blocking every caller with retries
+
+        closed: calls pass, consecutive failures are counted
+        open: after failure_threshold consecutive failures, calls are refused for reset_timeout seconds
+        half-open: after reset_timeout, one trial call passes; success closes, failure opens again
+
+        Args:
+            failure_threshold (int, optional): consecutive failures to open the circuit. Defaults to 3.
+            reset_timeout (float, optional): seconds to stay open before a trial call. Defaults to 30.0.
+        """
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        # monotonic time the trial call of the half-open circuit was let through
+        self.trial_started_at = 0.0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """check whether a call may pass
+
+        Returns:
+            bool: may the call pass?
+        """
+
+        with self.lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                # let one trial call through
+                self.state = HALF_OPEN
+                self.trial_started_at = now
+                return True
+            if self.state == HALF_OPEN:
+                # the trial call is running, the others are refused until it succeeds or fails;
+                # a trial call that never reported back is replaced after reset_timeout
+                if now - self.trial_started_at < self.reset_timeout:
+                    return False
+                self.trial_started_at = now
+                return True
+            return True
+
+    def record_success(self):
+        """a call succeeded, close the circuit
+        """
+
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        """a call failed (after all retries), open the circuit if the threshold is reached or the trial call failed
+
+        Returns:
+            bool: did the circuit open with this failure?
+        """
+
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def is_open(self):
+        """return whether calls are currently refused
+
+        Returns:
+            bool: circuit open?
+        """
+
+        with self.lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout
@@ -0,0 +1,183 @@
+import configparser
+import logging
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # not available on Windows, only the in-process lock is used there
+    fcntl = None
+
+# keys of section API the bot can not run without, the chat_ids have to be int's
+REQUIRED_KEYS = ['key', 'maintainer_chat_id', 'group_chat_id']
+CHAT_ID_KEYS = ['maintainer_chat_id', 'group_chat_id', 'group_chat_id2']
+
+
+def parse_id_list(value: str):
+    """parse a comma-separated list of chat_ids
+
+    Args:
+        value (str): e.g. '123, 456'
+
+    Returns:
+        list: the chat_ids as int's
+    """
+
+    return [int(chat_id) for chat_id in value.split(',') if chat_id.strip() != '']
+
+
+def validate(config: configparser.RawConfigParser):
+    """check that section API has all required keys and that its chat_ids are int's
+
+    Args:
+        config (configparser.RawConfigParser): the parsed file
+
+    Raises:
+        ValueError: if a required key is missing or empty, or a chat_id is not an int
+    """
+
+    for key in REQUIRED_KEYS:
+        if config.get('API', key, fallback='').strip() == '':
+            raise ValueError(f"[API] {key} is missing")
+    for key in CHAT_ID_KEYS:
+        if config.has_option('API', key):
+            int(config.get('API', key))
+
+
+class RuntimeConfigStore(object):
+    def __init__(self, path: str, _logger: logging.Logger):
+        """configuration file that can be changed at runtime (api.ini): reads are served from memory,
+        writes are atomic (write to a temporary file, then rename), changes of the file are picked up by reload_if_changed
+
+        Args:
+            path (str): path to the configuration file
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        self.path = path
+        self.logger = _logger
+        self.lock = threading.RLock()
+        self.config = configparser.RawConfigParser()
+        # (mtime, size) of the file when it was last loaded or written
+        self.file_signature = None
+        # parsed list, rebuilt on every load
+        self.admin_chat_ids = []
+        self.load()
+
+    def get_file_signature(self):
+        """get (mtime, size) of the file, changes whenever the file is rewritten
+
+        Returns:
+            (int, int): modification time in ns and size, None if the file does not exist
+        """
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        """(re)load the file into memory
+
+        Raises:
+            ValueError: if the file is incomplete or has a bad value, the current configuration is kept
+        """
+
+        with self.lock:
+            # parse and check everything first: a missing or bad value keeps the current configuration as a whole
+            config = configparser.RawConfigParser()
+            config.read(self.path, encoding='utf8')
+            validate(config)
+            file_signature = self.get_file_signature()
+            admin_chat_ids = parse_id_list(config.get('API', 'admin_chat_ids', fallback=''))
+            (self.config, self.file_signature, self.admin_chat_ids) = (config, file_signature, admin_chat_ids)
+
+    def reload_if_changed(self):
+        """hot reload: load the file again if it was changed since it was last loaded or written
+
+        Returns:
+            bool: was the file reloaded?
+        """
+
+        with self.lock:
+            if self.get_file_signature() == self.file_signature:
+                return False
+            self.logger.info(f"{self.path} changed, reloading")
+            try:
+                self.load()
+            except (configparser.Error, ValueError):
+                # e.g. half-written by an editor, keep the current values and try again on the next check
+                self.logger.error(f"reloading {self.path} failed, keeping the current configuration", exc_info=True)
+                return False
+            return True
+
+    def get(self, section: str, key: str, fallback: str = ''):
+        """read a value from memory
+
+        Args:
+            section (str): section of the value
+            key (str): key of the value
+            fallback (str, optional): returned if the value is missing. Defaults to ''.
+
+        Returns:
+            str: the value
+        """
+
+        with self.lock:
+            return self.config.get(section, key, fallback=fallback)
+
+    def set(self, section: str, key: str, value: str):
+        """change a value and persist the whole file atomically
+
+        Args:
+            section (str): section of the value
+            key (str): key of the value
+            value (str): new value
+        """
+
+        with self.lock:
+            if not self.config.has_section(section):
+                self.config.add_section(section)
+            self.config.set(section, key, value)
+            self.write()
+            self.admin_chat_ids = parse_id_list(self.get('API', 'admin_chat_ids'))
+
+    def write(self):
+        """write the configuration to a temporary file in the same directory and rename it over the file,
+        so a crash never leaves a half-written file; an advisory lock serializes writers of other processes
+        """
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with open(self.path + '.lock', 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            file_descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.api.', suffix='.tmp')
+            try:
+                with os.fdopen(file_descriptor, 'w', encoding='utf8') as temp_file:
+                    self.config.write(temp_file)
+                    temp_file.flush()
+                    os.fsync(temp_file.fileno())
+                if os.path.exists(self.path):
+                    # keep the permissions of the file holding the bot token
+                    os.chmod(temp_path, os.stat(self.path).st_mode)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            self.file_signature = self.get_file_signature()
+
+    def is_admin(self, chat_id: int):
+        """check whether chat_id may use the admin commands
+
+        Args:
+            chat_id (int): chat_id to check
+
+        Returns:
+            bool: is admin?
+        """
+
+        return chat_id in self.admin_chat_ids
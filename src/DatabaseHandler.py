@@ -1,5 +1,3 @@
-import traceback
-
 import mariadb
 import sys
 import configparser
@@ -7,7 +5,9 @@ import os
 import logging
 import datetime
 import time
+import random
 import re
+import threading
 import telepot
 
 import utility as util
@@ -15,18 +15,29 @@ from exceptions import NotifyUserException, NotifyAdminException
 from PlayerState import PlayerState
 from StateObject import StateObject
 from SpectatorState import SpectatorState
+from GameStats import GameStatsStore
+from CircuitBreaker import CircuitBreaker
+from IdentityRegistry import IdentityRegistry, get_display_name
+import Migrations
+from ConfigStore import RuntimeConfigStore
+
+# number of games per page of the game lists (keyboards)
+GAMES_PAGE_SIZE = 8
+# buttons to browse the pages of the game lists
+PREVIOUS_PAGE = '<< previous games'
+NEXT_PAGE = 'next games >>'
 
 
 class DatabaseHandler(object):
 
-    def __init__(self, bot: telepot.Bot, config: configparser.RawConfigParser, api_config: configparser.RawConfigParser,
+    def __init__(self, bot: telepot.Bot, config: configparser.RawConfigParser, config_store: RuntimeConfigStore,
                  _logger: logging.Logger):
         """initialize the DataBase Handler: establish connection to local database, set connection parameters, build player dictionary  for faster access
 
         Args:
             bot (telepot.Bot): main bot, used to send messages to admin in case of error
             config (configparser.RawConfigParser): provides credentials for database connection
-            api_config (configparser.RawConfigParser): provides maintainer_chat_id
+            config_store (RuntimeConfigStore): api.ini, provides maintainer_chat_id (read on every use, hot reloaded)
             _logger (logging.Logger): logger instance, the same over all modules, log to same file
 
         Raises:
@@ -37,111 +48,233 @@ class DatabaseHandler(object):
         self.config = config
         self.logger = _logger
         self.bot = bot
-        self.maintainer_chat_id = api_config['API']['maintainer_chat_id']
-        self.group_chat_id = api_config['API']['group_chat_id']
+        self.config_store = config_store
+
+        # settings of the resilient execution layer, see run_with_retry
+        self.ping_interval = self.config['CONNECTION'].getint('ping_interval', 300)
+        self.backoff_base = self.config['CONNECTION'].getfloat('backoff_base', 0.2)
+        self.backoff_cap = self.config['CONNECTION'].getfloat('backoff_cap', 2.0)
+        self.circuit_breaker = CircuitBreaker(self.config['CONNECTION'].getint('breaker_threshold', 3),
+                                              self.config['CONNECTION'].getfloat('breaker_reset_timeout', 30.0))
+        # connection and cursor are shared by the message loop and the scheduler
+        self.lock = threading.RLock()
 
         # Connect to MariaDB Platform
         try:
-            connection = mariadb.connect(
-                user=self.config['CONNECTION']['user'],
-                password=self.config['CONNECTION']['password'],
-                host=self.config['CONNECTION']['host'],
-                port=int(self.config['CONNECTION']['port']),
-                database=self.config['CONNECTION']['database']
-
-            )
+            self.connect()
         except mariadb.Error as e:
             self.logger.error(f"Error connecting to MariaDB Platform: {e}")
             raise NotifyAdminException(e)
         except:
             self.logger.error("Error in DB-Init", exc_info=True)
             raise NotifyAdminException
-
-        # Get Cursor and Connection
-        self.cursor = connection.cursor()
-        self.connection = connection
         self.logger.info("DataBase Handler started")
 
+        # bring the schema (tables, columns, indexes) up to date, see Migrations.py
+        Migrations.apply_migrations(self.connection, self.logger)
+
         # initialize id_to_game dictionary
         self.id_to_game = dict()
 
-        # set timeouts to 24hours to prevent "Server gone away - error"
-        try:
-            self.cursor.execute('SET SESSION wait_timeout=86400;')
-            self.cursor.execute('SET SESSION interactive_timeout=86400;')
-        except:
-            self.logger.warning(f"session parameters (timeouts) not set!", exc_info=True)
-            self.bot.sendMessage(self.maintainer_chat_id, 'Session parameters not set, will timeout in 8 hours')
+        # incremented on every change of DataBase.Games, caches of game data compare against it
+        self.data_version = 0
 
+        # (target date, data_version) -> result of get_games_in_exactly_x_days, shared by the scheduled jobs
+        self.games_on_day = dict()
+
+        # materialized attendance and rendered summaries per game, see get_stats_game
+        self.game_stats = GameStatsStore()
+
+        # players, spectators (and admins) in memory, presence / role / name lookups without a query
+        self.identities = IdentityRegistry()
         # build player dictionary for faster access of all player chat_id's
         self.player_chat_id_dict = self.init_player_chat_id_dict()
 
-    def execute_mysql_without_result(self, mysql_statement: str, numberOfTries: int):
-        """Execute the mysql query given in mysql_statement - if it fails, it invokes itself with numberOfTries incremented by one
-        if numberOfTries exceeds 2, an error is sent to maintainer_chat_id
+    @property
+    def maintainer_chat_id(self):
+        return self.config_store.get('API', 'maintainer_chat_id')
+
+    @property
+    def group_chat_id(self):
+        return self.config_store.get('API', 'group_chat_id')
+
+    def connect(self):
+        """open a new connection to the database, replaces self.connection and self.cursor
+
+        Raises:
+            mariadb.Error: if the connection can not be established
+        """
+
+        connection = mariadb.connect(
+            user=self.config['CONNECTION']['user'],
+            password=self.config['CONNECTION']['password'],
+            host=self.config['CONNECTION']['host'],
+            port=int(self.config['CONNECTION']['port']),
+            database=self.config['CONNECTION']['database']
+        )
+        # Get Cursor and Connection
+        self.cursor = connection.cursor()
+        self.connection = connection
+        self.last_used = time.monotonic()
+
+    def reconnect(self):
+        """drop the (broken) connection and open a new one
+
+        Raises:
+            mariadb.Error: if the connection can not be established
+        """
+
+        self.logger.warning("Reconnecting to the database")
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+        self.connect()
+
+    def close(self):
+        """close the connection to the database, e.g. on shutdown
+        """
+
+        with self.lock:
+            try:
+                self.connection.close()
+            except Exception:
+                self.logger.warning("closing the database connection failed", exc_info=True)
+
+    def ping(self):
+        """check the connection to the database and reconnect if it is broken, keeps an idle connection alive
+
+        Returns:
+            bool: is the database reachable?
+        """
+
+        with self.lock:
+            try:
+                self.connection.ping()
+            except mariadb.Error as err:
+                self.logger.warning(f"database ping failed: {err}")
+                try:
+                    self.reconnect()
+                except mariadb.Error as err:
+                    self.logger.error(f"reconnecting to the database failed: {err}")
+                    return False
+            self.last_used = time.monotonic()
+            return True
+
+    def get_backoff(self, numberOfTries: int):
+        """exponential backoff with full jitter
+
+        Args:
+            numberOfTries (int): how many times the statement was already tried
+
+        Returns:
+            float: seconds to wait before the next try
+        """
+
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** numberOfTries))
+
+    def run_with_retry(self, operation, description: str, numberOfTries: int = 0):
+        """run operation() on the shared connection and commit, retry with exponential backoff on connection failures
+        a broken connection is replaced before the next try, an idle connection is pinged first
+        errors of the statement itself (syntax, constraints) are not retried and do not count for the circuit breaker
+        while the circuit breaker is open (database down), fail immediately instead of retrying
+        the lock is only held while the statement runs, not during the backoff or while the admin is notified
+
+        Args:
+            operation (function): runs the statement(s) using self.connection / self.cursor, its result is returned
+            description (str): the statement(s), used for logging and the raised exception
+            numberOfTries (int, optional): how many times the statement was already tried. Defaults to 0.
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            the result of operation()
+        """
+
+        if not self.circuit_breaker.allow():
+            self.logger.warning(f"database unavailable (circuit open), not executing {description}")
+            raise NotifyUserException(f"database unavailable, not executed: {description}")
+
+        while True:
+            with self.lock:
+                try:
+                    self.logger.info(f"Executing {description}, numberOfTries = {numberOfTries}")
+                    if time.monotonic() - self.last_used > self.ping_interval:
+                        self.ping()
+                    result = operation()
+                    self.connection.commit()
+                except Exception as err:
+                    error = err
+                    self.logger.error(f" Tried {description} - {err}", exc_info=True)
+                    try:
+                        self.connection.rollback()
+                    except Exception:
+                        pass
+                    if isinstance(err, (mariadb.InterfaceError, mariadb.OperationalError)):
+                        # lost connection / server gone away
+                        try:
+                            self.reconnect()
+                        except mariadb.Error as reconnect_err:
+                            self.logger.error(f"reconnecting to the database failed: {reconnect_err}")
+                else:
+                    self.last_used = time.monotonic()
+                    self.circuit_breaker.record_success()
+                    return result
+
+            if not isinstance(error, (mariadb.InterfaceError, mariadb.OperationalError)):
+                # the database answered, the statement is wrong: retrying does not help
+                self.circuit_breaker.record_success()
+                raise NotifyUserException(description)
+            numberOfTries += 1
+            # raise NotifyUserException if unsuccesfully tried to execute statement 3 times
+            if numberOfTries > 2:
+                if self.circuit_breaker.record_failure():
+                    self.bot.sendMessage(self.maintainer_chat_id,
+                                         f"Database unavailable - failing fast for "
+                                         f"{self.circuit_breaker.reset_timeout} seconds\n{error}")
+                raise NotifyUserException(description)
+            time.sleep(self.get_backoff(numberOfTries))
+
+    def execute_mysql_without_result(self, mysql_statement: str, numberOfTries: int, parameters: tuple = None):
+        """Execute the mysql query given in mysql_statement and commit, see run_with_retry for retries and reconnects
 
         Args:
             mysql_statement (str): a string containing the mysql query to execute on the database
             numberOfTries (int): a number between 0 and 3 indicating how many times the query was already tried to execute
+            parameters (tuple, optional): values for the ?-placeholders in mysql_statement. Defaults to None.
 
         Raises:
             NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
         """
 
-        # raise NotifyUserException if unsuccesfully tried to execute statement 3 times
-        if numberOfTries > 2:
-            raise NotifyUserException(mysql_statement)
-        try:
-            self.logger.info(f"Executing {mysql_statement}, numberOfTries = {numberOfTries}")
-            self.cursor.execute(mysql_statement)
-        except self.connection.Error as err:
-            self.logger.error(f" Tried {mysql_statement} - {err}", exc_info=True)
-        except Exception as e:
-            self.logger.error(f"Unhandled exception: Tried {mysql_statement}, got {traceback.format_exc()}", exc_info=True)
-        else:
-            self.connection.commit()
-            return
+        def operation():
+            self.cursor.execute(mysql_statement, parameters or ())
 
-        self.connection.rollback()
-        # on fail: wait, increase number of tries and try again
-        time.sleep(0.5)
-        numberOfTries += 1
-        self.execute_mysql_without_result(mysql_statement, numberOfTries)
+        self.run_with_retry(operation, mysql_statement, numberOfTries)
 
-    def execute_mysql_with_result(self, mysql_statement: str, numberOfTries: int):
-        """executes the mysql query given in mysql_statement - if it fails, it invokes itself with numberOfTries incremented by one
-        if numberOfTries exceeds 2, an error is sent to maintainer_chat_id
+    def execute_mysql_with_result(self, mysql_statement: str, numberOfTries: int, parameters: tuple = None):
+        """executes the mysql query given in mysql_statement, see run_with_retry for retries and reconnects
 
         Args:
             mysql_statement (str): a string containing the mysql query to execute on the database
             numberOfTries (int): a number between 0 and 3 indicating how many times the query was already tried to execute
+            parameters (tuple, optional): values for the ?-placeholders in mysql_statement. Defaults to None.
 
         Raises:
             NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
 
         Returns:
-            mariadb.connection.cursor: the cursor object containing the database response
+            mariadb.connection.cursor: a buffered cursor object containing the database response
         """
 
-        # raise NotifyUserException if unsuccesfully tried to execute statement 3 times
-        if numberOfTries > 2:
-            raise NotifyUserException(mysql_statement)
-        try:
-            self.logger.info(f"Executing {mysql_statement}, numberOfTries = {numberOfTries}")
-            self.cursor.execute(mysql_statement)
-        except self.connection.Error as err:
-            self.logger.error(f" Tried {mysql_statement} - {err}", exc_info=True)
-        except Exception as e:
-            self.logger.error(f"Unhandled exception: Tried {mysql_statement}, got {traceback.format_exc()}",
-                              exc_info=True)
-        else:
-            return self.cursor
+        def operation():
+            # own buffered cursor: the result stays readable while other threads use the connection
+            cursor = self.connection.cursor(buffered=True)
+            cursor.execute(mysql_statement, parameters or ())
+            return cursor
 
-        self.connection.rollback()
-        # on fail: wait, increase number of tries and try again
-        time.sleep(0.5)
-        numberOfTries += 1
-        return self.execute_mysql_with_result(mysql_statement, numberOfTries)
+        return self.run_with_retry(operation, mysql_statement, numberOfTries)
 
     def init_user_state_map(self):
         """initialize the state_map dictionary from DataBase 
@@ -174,15 +307,17 @@ class DatabaseHandler(object):
 
         state_map = dict()
         try:
-            mysql_statement = "SELECT ID, State FROM Spectators;"
+            mysql_statement = "SELECT ID, State, FirstName, LastName FROM Spectators;"
             cursor = self.execute_mysql_with_result(mysql_statement, 0)
         except NotifyUserException:
             self.bot.sendMessage(self.maintainer_chat_id,
                                  f"Initialization of Spectator State Map failed\BOT NOT RUNNING")
             sys.exit(1)
         else:
-            for (ID, State) in cursor:
+            for (ID, State, FirstName, LastName) in cursor:
                 state_map[int(ID)] = SpectatorState(State)
+                self.identities.add_spectator(int(ID), get_display_name(FirstName, LastName),
+                                              State >= SpectatorState.DEFAULT.value)
             # self.logger.info(state_map)
             return state_map
 
@@ -190,7 +325,7 @@ class DatabaseHandler(object):
         """get all player id's and names from the Database for faster access in queries involving chat_id's
 
         Returns:
-            dict(): map from chat_id to Name
+            dict(): map from chat_id to (Name, Retired), the players of self.identities
         """
 
         mysql_statement = "SELECT ID, LastName, FirstName, Retired FROM Players;"
@@ -201,11 +336,188 @@ class DatabaseHandler(object):
                                  f"Initialization of Player to chat_id dictionary failed - BOT NOT RUNNING")
             sys.exit(1)
         else:
-            player_dict = dict()
             for (ID, LastName, FirstName, Retired) in cursor:
                 # store Max M. for fast pretty printing status
-                player_dict[ID] = (f"{FirstName} {LastName[:1]}\\.", Retired)
-            return player_dict
+                self.identities.add_player(ID, get_display_name(FirstName, LastName), Retired)
+            return self.identities.players
+
+    def games_changed(self, game_ids: list = None):
+        """invalidate cached game data after a write to DataBase.Games
+
+        Args:
+            game_ids (list, optional): IDs of the changed games, None if unknown / many. Defaults to None.
+        """
+
+        self.data_version += 1
+        if game_ids is None:
+            # changes unknown, reload the materialized stats on the next access
+            self.game_stats.clear()
+
+    def get_table_columns(self, table: str):
+        """get the column names of a table in the order of their definition
+
+        Args:
+            table (str): name of the table
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            list: the column names
+        """
+
+        mysql_statement = f"SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() " \
+                          f"AND TABLE_NAME = '{table}' ORDER BY ORDINAL_POSITION;"
+        try:
+            cursor = self.execute_mysql_with_result(mysql_statement, 0)
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            return [COLUMN_NAME for (COLUMN_NAME,) in cursor.fetchall()]
+
+    def archive_games(self, keep_days: int = 1):
+        """move all games older than keep_days (including their attendance) from Games to GamesArchive in one transaction
+        keeps Games small, so the queries on upcoming games stay cheap
+
+        Args:
+            keep_days (int, optional): games of the last keep_days days stay in Games. Defaults to 1.
+
+        Raises:
+            NotifyAdminException: General Error to tell DataBase Access failed, admin will be notified
+
+        Returns:
+            int: number of archived games
+        """
+
+        try:
+            games_columns = self.get_table_columns('Games')
+            archive_columns = self.get_table_columns('GamesArchive')
+        except NotifyUserException as nuException:
+            raise NotifyAdminException(nuException)
+
+        # player columns added after the archive was created
+        for column in games_columns:
+            if column not in archive_columns:
+                try:
+                    self.execute_mysql_without_result(f"ALTER TABLE GamesArchive ADD COLUMN IF NOT EXISTS {column} INT DEFAULT 0;", 0)
+                except NotifyUserException as nuException:
+                    raise NotifyAdminException(nuException)
+
+        columns = ', '.join(games_columns)
+        condition = f"DateTime < DATE_SUB(CURDATE(), INTERVAL {int(keep_days)} DAY)"
+
+        def operation():
+            self.cursor.execute(f"INSERT INTO GamesArchive({columns}) SELECT {columns} FROM Games WHERE {condition};")
+            archived_rows = self.cursor.rowcount
+            self.cursor.execute(f"DELETE FROM Games WHERE {condition};")
+            return archived_rows
+
+        try:
+            archived_games = self.run_with_retry(operation, f"archiving games with {condition}")
+        except NotifyUserException as nuException:
+            raise NotifyAdminException(f"Archiving games failed: {nuException}")
+        else:
+            if archived_games > 0:
+                self.games_changed()
+            self.logger.info(f"Archived {archived_games} games")
+            return archived_games
+
+    def upsert_games(self, events, batch_size: int = 100, delete_missing: bool = False):
+        """insert new and update changed games from a stream of parsed ics-events, all in one transaction
+        games are matched on the UID of the event, the attendance columns of updated games stay untouched
+        games entered before the UID existed (UID NULL) are matched on DateTime and Adversary, their UID is backfilled
+
+        Args:
+            events (iterable): dicts with keys uid, dateTime, place, adversary (see ImportUtility.iter_events)
+            batch_size (int, optional): number of rows written per executemany. Defaults to 100.
+            delete_missing (bool, optional): delete future imported games that are not in events. Defaults to False.
+
+        Raises:
+            NotifyAdminException: General Error to tell DataBase Access failed, admin will be notified
+
+        Returns:
+            dict: number of inserted, updated, unchanged (and deleted, if delete_missing) games
+        """
+
+        # dedupe on the UID, the last occurrence of an event wins
+        new_games = dict()
+        for event in events:
+            new_games[event['uid']] = (event['dateTime'], event['place'], event['adversary'])
+
+        def operation():
+            counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'backfilled': 0}
+            to_insert = []
+            to_update = []
+            to_delete = []
+            self.cursor.execute("SELECT UID, DateTime, Place, Adversary FROM Games WHERE UID IS NOT NULL;")
+            existing_games = {UID: (str(DateTime), Place, Adversary) for (UID, DateTime, Place, Adversary) in
+                              self.cursor.fetchall()}
+            # past games of the feed are already archived, leave them alone
+            self.cursor.execute("SELECT UID FROM GamesArchive WHERE UID IS NOT NULL;")
+            archived_uids = {UID for (UID,) in self.cursor.fetchall()}
+
+            # games without UID (entered before migration 1): backfill the UID of the matching event, so the game
+            # and its attendance is kept instead of inserting a copy of it
+            for table in ['Games', 'GamesArchive']:
+                self.cursor.execute(f"SELECT ID, DateTime, Place, Adversary FROM {table} WHERE UID IS NULL;")
+                legacy_games = {(str(DateTime), Adversary): (ID, Place) for (ID, DateTime, Place, Adversary) in
+                                self.cursor.fetchall()}
+                backfill = []
+                for uid, game in new_games.items():
+                    if uid in existing_games or uid in archived_uids:
+                        continue
+                    legacy_game = legacy_games.pop((game[0], game[2]), None)
+                    if legacy_game is None:
+                        continue
+                    backfill.append((uid, legacy_game[0]))
+                    if table == 'Games':
+                        existing_games[uid] = (game[0], legacy_game[1], game[2])
+                    else:
+                        archived_uids.add(uid)
+                for start in range(0, len(backfill), batch_size):
+                    self.cursor.executemany(f"UPDATE {table} SET UID = ? WHERE ID = ?;",
+                                            backfill[start:start + batch_size])
+                counts['backfilled'] += len(backfill)
+            for uid, game in new_games.items():
+                if uid in archived_uids:
+                    counts['unchanged'] += 1
+                elif uid not in existing_games:
+                    to_insert.append((uid,) + game)
+                elif existing_games[uid] != game:
+                    to_update.append(game + (uid,))
+                else:
+                    counts['unchanged'] += 1
+            if delete_missing:
+                now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                to_delete = [(uid,) for uid, game in existing_games.items() if
+                             uid not in new_games and game[0] > now]
+
+            for start in range(0, len(to_insert), batch_size):
+                self.cursor.executemany("INSERT INTO Games(UID, DateTime, Place, Adversary) VALUES(?, ?, ?, ?);",
+                                        to_insert[start:start + batch_size])
+            for start in range(0, len(to_update), batch_size):
+                self.cursor.executemany("UPDATE Games SET DateTime = ?, Place = ?, Adversary = ? WHERE UID = ?;",
+                                        to_update[start:start + batch_size])
+            for start in range(0, len(to_delete), batch_size):
+                self.cursor.executemany("DELETE FROM Games WHERE UID = ?;", to_delete[start:start + batch_size])
+
+            counts['inserted'] = len(to_insert)
+            counts['updated'] = len(to_update)
+            if delete_missing:
+                counts['deleted'] = len(to_delete)
+            return counts
+
+        # the whole import is one transaction, retried as a whole
+        try:
+            counts = self.run_with_retry(operation, f"importing {len(new_games)} games")
+        except NotifyUserException as nuException:
+            raise NotifyAdminException(f"Importing games failed: {nuException}")
+        else:
+            # a moved game has a new date-string
+            self.id_to_game.clear()
+            self.games_changed()
+            self.logger.info(f"Imported games: {counts}")
+            return counts
 
     def get_games_in_exactly_x_days(self, x: int):
         """Query the Database to get all games taking place in exactly x days
@@ -218,11 +530,18 @@ class DatabaseHandler(object):
             NotifyAdminException: if a database access fails, raise exception to notify admin
 
         Returns:
-            [([], [])]: return a list of tuples: for each game on this given day, return a tuple containing the games infos (tuple(0)) and the players still unsure (tuple(1))
+            [([], [])]: return a list of tuples: for each game on this given day, return a tuple containing the games infos (tuple(0): [DateTime, Adversary, Place, ID]) and the players still unsure (tuple(1))
+            the list is cached until the date or DataBase.Games changes, shared by all callers: do not modify it
         """
 
+        # jobs running close together (reminders, stats to the group chat) share one query per day
+        key = (datetime.date.today() + datetime.timedelta(days=int(x)), self.data_version)
+        if key in self.games_on_day:
+            return self.games_on_day[key]
+
         (player_columns, player_list) = self.get_player_columns()
-        mysql_statement = f"SELECT DateTime, Place, Adversary {player_columns} FROM Games WHERE DATE(DateTime) = DATE_ADD(CURDATE(), INTERVAL {x} DAY) ORDER BY DateTime ASC;"
+        # range condition instead of DATE(DateTime) = ..., so the index on DateTime can be used
+        mysql_statement = f"SELECT DateTime, Place, Adversary, ID {player_columns} FROM Games WHERE DateTime >= DATE_ADD(CURDATE(), INTERVAL {int(x)} DAY) AND DateTime < DATE_ADD(CURDATE(), INTERVAL {int(x) + 1} DAY) ORDER BY DateTime ASC;"
         try:
             cursor = self.execute_mysql_with_result(mysql_statement, 0)
         except NotifyUserException as nuException:
@@ -234,16 +553,21 @@ class DatabaseHandler(object):
                 game_dateTime = row[0]
                 game_place = row[1]
                 game_adversary = row[2]
+                game_id = row[3]
                 unsure_chat_id_list = []
-                count = 3
-                # iterate over players, add them to unsure-list of their status is unsure
+                count = 4
+                # iterate over players, add them to unsure-list of their status is unsure (retired players get no reminders)
                 for player in player_list:
                     player_status = row[count]
-                    if player_status == 0:
+                    if player_status == 0 and not self.identities.is_retired(player):
                         unsure_chat_id_list.append(player)
                     count += 1
-                game_info = [str(game_dateTime), game_adversary, game_place]
+                game_info = [str(game_dateTime), game_adversary, game_place, game_id]
                 result_tuple_list.append((game_info, unsure_chat_id_list))
+            # entries of past dates or older data versions are not requested again
+            self.games_on_day = {cached_key: games for cached_key, games in self.games_on_day.items() if
+                                 cached_key[1] == key[1] and cached_key[0] >= datetime.date.today()}
+            self.games_on_day[key] = result_tuple_list
             return result_tuple_list
 
     def insert_new_player(self, chat_id: int, firstname: str, lastname: str):
@@ -272,9 +596,14 @@ class DatabaseHandler(object):
             # insert new column into Games-Table
             mysql_statement2 = f"ALTER TABLE Games ADD COLUMN {new_column_name} INT DEFAULT 0;"
             self.execute_mysql_without_result(mysql_statement2, 0)
+            mysql_statement3 = f"ALTER TABLE GamesArchive ADD COLUMN IF NOT EXISTS {new_column_name} INT DEFAULT 0;"
+            self.execute_mysql_without_result(mysql_statement3, 0)
 
             # add new player to player_chat_id_dict
-            self.player_chat_id_dict[chat_id] = (f"{firstname} {lastname[:1]}\\.", False)
+            self.identities.add_player(chat_id, get_display_name(firstname, lastname))
+            self.game_stats.add_player(chat_id)
+            # new column in every game (unsure by default), the materialized stats were updated by add_player
+            self.games_changed([])
 
         except NotifyUserException:
             raise NotifyUserException
@@ -302,52 +631,29 @@ class DatabaseHandler(object):
             self.execute_mysql_without_result(mysql_statement, 0)
         except NotifyUserException:
             raise NotifyUserException
+        else:
+            self.identities.add_spectator(chat_id, get_display_name(firstname, lastname))
 
-    def player_present(self, chat_id: int):
-        """check and return if a player is already in the database
+    def get_games_list_for_spectator(self, page: tuple = None):
+        """Assemble a page of the future games for a spectator
 
         Args:
-            chat_id (int): chat_id of the player to search database for
-
-        Raises:
-            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
-
-        Returns:
-            bool: is the player present in the database? 
-        """
-
-        try:
-            mysql_statement = f"SELECT * FROM Players WHERE ID = {chat_id}"
-            cursor = self.execute_mysql_with_result(mysql_statement, 0)
-        except NotifyUserException:
-            raise NotifyUserException
-        else:
-            cursor.fetchall()
-            return cursor.rowcount > 0
-
-    def get_games_list_for_spectator(self):
-        """Assemble a list of all future games for a spectator
+            page (tuple, optional): which page, see get_games_page. Defaults to None (first page).
 
         Raises:
             NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
 
         Returns:
-            [[]]: a list of lists containing the infos for each game
+            ([[]], ()): a list of lists containing the infos for each game, keys of the page (see get_games_page)
         """
 
-        # get ordered list of games in the future
-        button_list = [['continue later']]
         # make sure to have 'continue later' at top of button_list
-        try:
-            mysql_statement = f"SELECT DateTime, Place FROM Games WHERE DateTime > CURDATE() ORDER BY DateTime ASC;"
-            cursor = self.execute_mysql_with_result(mysql_statement, 0)
-        except NotifyUserException:
-            raise NotifyUserException
-        else:
-            # pretty print columns, add to buttons
-            for (DateTime, Place) in cursor:
-                button_list.append([util.pretty_print_game(DateTime, Place)])
-            return button_list
+        button_list = [['continue later']]
+        (games, page_keys, page_buttons) = self.get_games_page('Place', page)
+        # pretty print columns, add to buttons
+        for (ID, DateTime, Place) in games:
+            button_list.append([util.pretty_print_game(DateTime, Place)])
+        return button_list + page_buttons, page_keys
 
     def get_pending_spectators(self):
         """Assemble a list of all pending spectators
@@ -377,84 +683,287 @@ class DatabaseHandler(object):
                 return None
 
     def get_player_stats(self):
-        """Dump the Players database to a message
+        """Dump the Players database, line by line
 
-                Raises:
-                    NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
 
-                Returns:
-                    str: a string containing a dump of the Players database
-                """
-        result = 'Database dump from Table Players:\n'
-        collection = []
+        Returns:
+            generator: the lines of the dump, see utility.pretty_print_player_db
+        """
         try:
             mysql_statement = f"SELECT ID, LastName, FirstName, State, Retired FROM Players;"
             cursor = self.execute_mysql_with_result(mysql_statement, 0)
         except NotifyUserException:
             raise NotifyUserException
         else:
-            # pretty print columns, add to buttons
-            for (ID, LastName, FirstName, State, Retired) in cursor:
-                collection.append((ID, LastName, FirstName, State, Retired))
-            return util.pretty_print_player_db(collection)
+            return util.pretty_print_player_db(cursor.fetchall())
+
+    def iter_players(self):
+        """get the Players table for an export
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            (list, iterable): column names, rows (buffered cursor: the rows are in memory, the csv is built line by line)
+        """
+
+        header = ['ID', 'LastName', 'FirstName', 'State', 'Retired']
+        try:
+            cursor = self.execute_mysql_with_result(f"SELECT {', '.join(header)} FROM Players ORDER BY ID;", 0)
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            return header, cursor
+
+    def iter_spectators(self):
+        """get the Spectators table for an export
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
 
-    def get_games_list_with_status_summary(self):
-        """Assemble a list of all future games including the current status of the player with chat_id
+        Returns:
+            (list, iterable): column names, rows (buffered cursor: the rows are in memory, the csv is built line by line)
+        """
+
+        header = ['ID', 'LastName', 'FirstName', 'State']
+        try:
+            cursor = self.execute_mysql_with_result(f"SELECT {', '.join(header)} FROM Spectators ORDER BY ID;", 0)
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            return header, cursor
+
+    def iter_attendance_matrix(self):
+        """get the attendance of all players for all games (GamesArchive and Games) for an export
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            (list, iterable): column names (player columns as names), rows ordered by DateTime (buffered cursor)
+        """
+
+        (player_columns, player_list) = self.get_player_columns()
+        columns = f"ID, DateTime, Place, Adversary {player_columns}"
+        try:
+            mysql_statement = f"SELECT {columns} FROM GamesArchive UNION ALL SELECT {columns} FROM Games " \
+                              f"ORDER BY DateTime ASC;"
+            cursor = self.execute_mysql_with_result(mysql_statement, 0)
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            # names are escaped for MarkdownV2
+            names = [self.player_chat_id_dict[player][0].replace('\\', '') for player in player_list]
+            return ['ID', 'DateTime', 'Place', 'Adversary'] + names, cursor
+
+    def get_games_list_with_status_summary(self, page: tuple = None):
+        """Assemble a page of the future games including the summary of the attendance
 
         Args:
-            chat_id (int): the chat_id of the player to get the list for (and status)
+            page (tuple, optional): which page, see get_games_page. Defaults to None (first page).
 
         Raises:
             NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
 
         Returns:
-            [[]]: a list of lists containing the infos for each game
+            ([[]], ()): a list of lists containing the infos for each game, keys of the page (see get_games_page)
         """
 
-        # get ordered list of games in the future
+        # make sure to have 'continue later' at top of button_list
         button_list = [['continue later']]
+        (games, page_keys, page_buttons) = self.get_games_page('', page)
+        game_ids = [ID for (ID, DateTime) in games]
+        # materialized summaries, games not requested before are loaded with one query
+        game_stats = self.get_game_stats(game_ids)
+        for ID in game_ids:
+            if ID in game_stats:
+                button_list.append([game_stats[ID].render(self.player_chat_id_dict, short=True)])
+        return button_list + page_buttons, page_keys
+
+    def get_games_list_with_status(self, chat_id: int, page: tuple = None):
+        """Assemble a page of the future games including the current status of the player with chat_id
+
+        Args:
+            chat_id (int): the chat_id of the player to get the list for (and status)
+            page (tuple, optional): which page, see get_games_page. Defaults to None (first page).
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            ([[]], ()): a list of lists containing the infos for each game, keys of the page (see get_games_page)
+        """
+
         # make sure to have 'continue later' at top of button_list
+        button_list = [['continue later']]
+        (games, page_keys, page_buttons) = self.get_games_with_status(chat_id, page)
+        # pretty print columns, add to buttons
+        for (ID, DateTime, Place, player_col) in games:
+            button_list.append([util.pretty_print_game(DateTime, Place, player_col)])
+        return button_list + page_buttons, page_keys
+
+    def get_games_with_status(self, chat_id: int, page: tuple = None):
+        """get a page of the future games including the current status of the player with chat_id
+
+        Args:
+            chat_id (int): the chat_id of the player to get the list for (and status)
+            page (tuple, optional): which page, see get_games_page. Defaults to None (first page).
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            ([()], (), [[]]): tuples (ID, DateTime, Place, status) ordered by DateTime, keys and buttons of the page
+        """
+
+        (games, page_keys, page_buttons) = self.get_games_page(f"Place, p{int(chat_id)}", page)
+        for (ID, DateTime, Place, player_col) in games:
+            if ID not in self.id_to_game:
+                self.id_to_game[ID] = f"{util.make_datetime_pretty(DateTime)}"
+        return games, page_keys, page_buttons
+
+    def get_games_page(self, columns: str, page: tuple = None, page_size: int = GAMES_PAGE_SIZE):
+        """get a page of the future games ordered by (DateTime, ID): keyset pagination, every page is a range read
+        on the index games_datetime_id instead of reading all future games
+
+        Args:
+            columns (str): comma separated columns to select in addition to ID, DateTime ('' for none)
+            page (tuple, optional): (direction, DateTime, ID) with direction 'next' (games after the game (DateTime, ID))
+                or 'previous' (games before it). Defaults to None (first page).
+            page_size (int, optional): number of games per page. Defaults to GAMES_PAGE_SIZE.
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            ([()], (), [[]]): rows (ID, DateTime, columns...), keys ((DateTime, ID) of the first and the last game,
+            None if there are no games) and the buttons to browse to the previous / next page
+        """
+
+        select = f"SELECT ID, DateTime{', ' + columns if columns else ''} FROM Games WHERE DateTime > CURDATE()"
+        direction = None if page is None else page[0]
+        if direction == 'previous':
+            mysql_statement = f"{select} AND (DateTime < ? OR (DateTime = ? AND ID < ?)) " \
+                              f"ORDER BY DateTime DESC, ID DESC LIMIT {int(page_size) + 1};"
+        elif direction == 'next':
+            mysql_statement = f"{select} AND (DateTime > ? OR (DateTime = ? AND ID > ?)) " \
+                              f"ORDER BY DateTime ASC, ID ASC LIMIT {int(page_size) + 1};"
+        else:
+            mysql_statement = f"{select} ORDER BY DateTime ASC, ID ASC LIMIT {int(page_size) + 1};"
+        parameters = None if direction is None else (page[1], page[1], page[2])
+        try:
+            cursor = self.execute_mysql_with_result(mysql_statement, 0, parameters)
+        except NotifyUserException:
+            raise NotifyUserException
+        rows = cursor.fetchall()
+        if len(rows) == 0 and direction is not None:
+            # the page is gone (games played or deleted), start over
+            return self.get_games_page(columns, None, page_size)
+        # one more row than needed tells whether there are more games in this direction
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if direction == 'previous':
+            rows.reverse()
+            (has_previous, has_next) = (has_more, True)
+        else:
+            (has_previous, has_next) = (direction is not None, has_more)
+        page_keys = None
+        if len(rows) > 0:
+            page_keys = ((rows[0][1], rows[0][0]), (rows[-1][1], rows[-1][0]))
+        page_buttons = []
+        navigation = ([PREVIOUS_PAGE] if has_previous else []) + ([NEXT_PAGE] if has_next else [])
+        if len(navigation) > 0:
+            page_buttons.append(navigation)
+        return rows, page_keys, page_buttons
+
+    def get_game_with_status(self, game_id: int, chat_id: int):
+        """get a single game including the current status of the player with chat_id
+
+        Args:
+            game_id (int): the ID of the game
+            chat_id (int): the chat_id of the player to get the status for
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            (): a tuple (DateTime, Place, Adversary, status), None if the game does not exist
+        """
+
+        player_column = f"p{chat_id}"
         try:
-            mysql_statement = f"SELECT ID FROM Games WHERE DateTime > CURDATE() ORDER BY DateTime ASC;"
+            mysql_statement = f"SELECT DateTime, Place, Adversary, {player_column} FROM Games WHERE ID = {int(game_id)};"
             cursor = self.execute_mysql_with_result(mysql_statement, 0)
+            return_row = cursor.fetchone()
+            if return_row is None:
+                # finished games are in the archive
+                mysql_statement = f"SELECT DateTime, Place, Adversary, {player_column} FROM GamesArchive WHERE ID = {int(game_id)};"
+                cursor = self.execute_mysql_with_result(mysql_statement, 0)
+                return_row = cursor.fetchone()
         except NotifyUserException:
             raise NotifyUserException
         else:
-            # pretty print columns, add to buttons
-            rows = cursor.fetchall()
-            for (ID,) in rows:
-                button_list.append([self.get_stats_game(ID, short=True)])
-            return button_list
+            return return_row
 
-    def get_games_list_with_status(self, chat_id: int):
-        """Assemble a list of all future games including the current status of the player with chat_id
+    def get_calendar_games(self, chat_id: int = None):
+        """get all games not archived yet for the calendar feeds, with the attendance of a player
 
         Args:
-            chat_id (int): the chat_id of the player to get the list for (and status)
+            chat_id (int, optional): the chat_id of the player, None for the team feed. Defaults to None.
 
         Raises:
             NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
 
         Returns:
-            [[]]: a list of lists containing the infos for each game
+            [()]: a list of tuples (ID, DateTime, Place, Adversary, status), status is None for the team feed
         """
 
-        # get ordered list of games in the future
-        player_column = f"p{chat_id}"
-        button_list = [['continue later']]
-        # make sure to have 'continue later' at top of button_list
+        status_column = 'NULL' if chat_id is None else f"p{int(chat_id)}"
         try:
-            mysql_statement = f"SELECT ID, DateTime, Place, {player_column} FROM Games WHERE DateTime > CURDATE() ORDER BY DateTime ASC;"
+            mysql_statement = f"SELECT ID, DateTime, Place, Adversary, {status_column} FROM Games ORDER BY DateTime ASC;"
             cursor = self.execute_mysql_with_result(mysql_statement, 0)
         except NotifyUserException:
             raise NotifyUserException
         else:
-            # pretty print columns, add to buttons
-            for (ID, DateTime, Place, player_col) in cursor:
-                button_list.append([util.pretty_print_game(DateTime, Place, player_col)])
-                if ID not in self.id_to_game:
-                    self.id_to_game[ID] = f"{util.make_datetime_pretty(DateTime)}"
-            return button_list
+            return cursor.fetchall()
+
+    def get_game_schedule(self):
+        """get DateTime, Place and Adversary of all upcoming games, used to detect moved games
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            [()]: a list of tuples (ID, DateTime, Place, Adversary)
+        """
+
+        try:
+            mysql_statement = "SELECT ID, DateTime, Place, Adversary FROM Games WHERE DateTime > CURRENT_TIMESTAMP();"
+            cursor = self.execute_mysql_with_result(mysql_statement, 0)
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            return cursor.fetchall()
+
+    def get_approved_spectators(self):
+        """get the chat_ids of all approved spectators
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            list: chat_ids of the approved spectators
+        """
+
+        try:
+            mysql_statement = f"SELECT ID FROM Spectators WHERE State >= {SpectatorState.DEFAULT.value};"
+            cursor = self.execute_mysql_with_result(mysql_statement, 0)
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            return [int(ID) for (ID,) in cursor.fetchall()]
 
     def get_player_columns(self):
         """used by DataBase Handler to get a list of all players and all player-columns (p...) in the same order
@@ -471,71 +980,152 @@ class DatabaseHandler(object):
         return (player_columns, player_list)
 
     def get_stats_game(self, game_id: int = -1, short: bool = False):
-        """return the summary for the next game in the future indicating which players will play and which won't
+        """return the summary for a game (default: the next game in the future) indicating which players will play and which won't
+        the summary is materialized in self.game_stats, the database is only queried the first time a game is requested
+
+        Args:
+            game_id (int, optional): ID of the game, the next game in the future if negative. Defaults to -1.
+            short (bool, optional): one-line summary (for buttons) instead of the full MarkdownV2 text. Defaults to False.
 
         Raises:
             NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
 
         Returns:
-            str: a string, pretty-printed with the status uf the next game
+            str: a string, pretty-printed with the status uf the game
         """
-        (player_columns, player_list) = self.get_player_columns()
 
-        try:
-            mysql_statement = f"SELECT DateTime, Place, Adversary {player_columns} FROM Games WHERE ID={game_id};"
+        if game_id < 0:
+            game_id = self.get_next_game_id()
             if game_id < 0:
-                mysql_statement = f"SELECT DateTime, Place, Adversary {player_columns} FROM Games WHERE DateTime > CURRENT_TIMESTAMP() ORDER BY DateTime ASC LIMIT 1;"
+                return 'There are no upcoming games\\!'
+
+        game_stats = self.get_game_stats([game_id]).get(game_id)
+        if game_stats is None:
+            raise NotifyUserException(f"Game {game_id} not found")
+        return game_stats.render(self.player_chat_id_dict, short=short)
+
+    def get_next_game_id(self):
+        """get the ID of the next game in the future
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            int: ID of the next game, -1 if there are no upcoming games
+        """
+
+        try:
+            mysql_statement = "SELECT ID FROM Games WHERE DateTime > CURRENT_TIMESTAMP() ORDER BY DateTime ASC LIMIT 1;"
             cursor = self.execute_mysql_with_result(mysql_statement, 0)
         except NotifyUserException:
             raise NotifyUserException
         else:
             return_row = cursor.fetchone()
-            result = ''
-            # create 3 lists for Yes(1), No(2), Unsure(0)
-            yes_list = []
-            no_list = []
-            unsure_list = []
-
-            # first row of result: pretty-printed game_infos
-            result = f"{util.make_datetime_pretty_md(return_row[0])} \\| {return_row[1]} \\| {return_row[2]}\n"
-            count = 3
-            for player in player_list:
-                # iterate over players, add to yes/no/unsure_list according to their status
-                status = return_row[count]
-                if status == 0:
-                    if not self.player_chat_id_dict[player][1]:
-                        unsure_list.append(self.player_chat_id_dict[player][0])
-                elif status == 1:
-                    yes_list.append(self.player_chat_id_dict[player][0])
-                elif status == 2:
-                    no_list.append(self.player_chat_id_dict[player][0])
-                count += 1
-
-            if short:
-                pretty_summary = f"{len(yes_list)}Y / {len(no_list)}N / {len(unsure_list)}U"
-                pretty_datetime = util.make_datetime_pretty(return_row[0])
-                return f"{pretty_datetime} | {return_row[1]} | {pretty_summary}"
-
-            # total player count
-            player_count = len(yes_list) + len(no_list) + len(unsure_list)
-
-            # assemble result, loop over each list
-            result += f"\n  *Team / Yes \\({len(yes_list)}/{player_count}\\)*:\n"
-            if len(yes_list) > 0:
-                for yes_player in yes_list:
-                    result += f"        {yes_player}\n"
+            return -1 if return_row is None else return_row[0]
+
+    def get_game_stats(self, game_ids: list):
+        """get the materialized GameStats of the given games, load the missing ones with a single query
+
+        Args:
+            game_ids (list): IDs of the games
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            dict: map from game ID to GameStats, games not in the database are missing
+        """
+
+        result = dict()
+        missing_ids = []
+        for game_id in game_ids:
+            game_stats = self.game_stats.get(game_id)
+            if game_stats is None:
+                missing_ids.append(str(int(game_id)))
+            else:
+                result[game_id] = game_stats
+        if len(missing_ids) > 0:
+            (player_columns, player_list) = self.get_player_columns()
+            try:
+                mysql_statement = f"SELECT ID, DateTime, Place, Adversary {player_columns} FROM Games WHERE ID IN ({', '.join(missing_ids)});"
+                cursor = self.execute_mysql_with_result(mysql_statement, 0)
+            except NotifyUserException:
+                raise NotifyUserException
             else:
-                result += "        No one yet\\!\n"
-            if len(no_list) > 0:
-                result += f"\n  *No \\({len(no_list)}/{player_count}\\)*:\n"
-                for no_player in no_list:
-                    result += f"        {no_player}\n"
-            if len(unsure_list) > 0:
-                result += f"\n  *Still Unsure \\({len(unsure_list)}/{player_count}\\)*:\n"
-                for unsure_player in unsure_list:
-                    result += f"        {unsure_player}\n"
-
-            return result
+                for row in cursor.fetchall():
+                    result[row[0]] = self.game_stats.load_row(row[0], row[1:], player_list)
+            # games not found are finished games, read them from the archive
+            archived_ids = [game_id for game_id in missing_ids if int(game_id) not in result]
+            if len(archived_ids) > 0:
+                try:
+                    mysql_statement = f"SELECT ID, DateTime, Place, Adversary {player_columns} FROM GamesArchive WHERE ID IN ({', '.join(archived_ids)});"
+                    cursor = self.execute_mysql_with_result(mysql_statement, 0)
+                except NotifyUserException:
+                    raise NotifyUserException
+                else:
+                    for row in cursor.fetchall():
+                        result[row[0]] = self.game_stats.load_row(row[0], row[1:], player_list)
+        return result
+
+    def get_attendance_history(self):
+        """get the attendance of all players for all past games, from Games and GamesArchive
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            ([], [()]): chat_ids of the player columns, rows (ID, DateTime, Place, Adversary, p..., p...) ordered by DateTime
+        """
+
+        (player_columns, player_list) = self.get_player_columns()
+        columns = f"ID, DateTime, Place, Adversary {player_columns}"
+        try:
+            mysql_statement = f"SELECT {columns} FROM GamesArchive UNION ALL " \
+                              f"SELECT {columns} FROM Games WHERE DateTime < NOW() ORDER BY DateTime ASC;"
+            cursor = self.execute_mysql_with_result(mysql_statement, 0)
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            return player_list, cursor.fetchall()
+
+    def get_past_game_count(self):
+        """count the past games, from Games and GamesArchive
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            int: number of past games
+        """
+
+        try:
+            mysql_statement = "SELECT (SELECT COUNT(*) FROM GamesArchive) + (SELECT COUNT(*) FROM Games WHERE DateTime < NOW());"
+            cursor = self.execute_mysql_with_result(mysql_statement, 0)
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            return int(cursor.fetchone()[0])
+
+    def get_response_lead_times(self):
+        """get, for every past game and player, how many hours before the game the player first answered YES or NO
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            [()]: rows (PlayerID, hours)
+        """
+
+        try:
+            mysql_statement = "SELECT l.PlayerID, TIMESTAMPDIFF(MINUTE, MIN(l.ChangedAt), g.DateTime) / 60 " \
+                              "FROM AttendanceLog l JOIN (SELECT ID, DateTime FROM GamesArchive UNION ALL " \
+                              "SELECT ID, DateTime FROM Games WHERE DateTime < NOW()) g ON g.ID = l.GameID " \
+                              "WHERE l.Status <> 0 GROUP BY l.GameID, l.PlayerID, g.DateTime;"
+            cursor = self.execute_mysql_with_result(mysql_statement, 0)
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            return cursor.fetchall()
 
     def insert_games(self):
         """Backup of all Games data in case reinsertion into DataBase is needed
@@ -597,6 +1187,16 @@ class DatabaseHandler(object):
                     raise NotifyAdminException
                 else:
                     return_row = cursor.fetchone()
+                    if return_row is None:
+                        # finished games are in the archive
+                        mysql_statement = f" SELECT ID FROM GamesArchive WHERE DateTime = '{dateTime}';"
+                        try:
+                            cursor = self.execute_mysql_with_result(mysql_statement, 0)
+                        except NotifyUserException:
+                            raise NotifyAdminException
+                        return_row = cursor.fetchone()
+                        if return_row is None:
+                            return -1
                     game_id = return_row[0]
                     self.id_to_game[game_id] = game
                     return game_id
@@ -617,11 +1217,76 @@ class DatabaseHandler(object):
 
         new_status_translated = util.translate_status_from_str(new_status)
         player_column = f"p{chat_id}"
-        mysql_statement = f" UPDATE Games SET {player_column} = {new_status_translated} WHERE ID = {game_id};"
+        # only a real change is written and logged, re-answering the same status is not a new answer
+        condition = f"ID = {int(game_id)} AND NOT ({player_column} <=> {new_status_translated})"
+        mysql_statement = f" UPDATE Games SET {player_column} = {new_status_translated} WHERE {condition};"
+        # log the change (for the response times in Analytics), in the same transaction
+        log_statement = f"INSERT INTO AttendanceLog(GameID, PlayerID, Status) " \
+                        f"SELECT ID, {int(chat_id)}, {new_status_translated} FROM Games WHERE {condition};"
+
+        def operation():
+            self.cursor.execute(log_statement)
+            self.cursor.execute(mysql_statement)
+            return self.cursor.rowcount
+
         try:
-            self.execute_mysql_without_result(mysql_statement, 0)
+            changed = self.run_with_retry(operation, mysql_statement)
         except NotifyUserException:
             raise NotifyUserException
+        if changed > 0:
+            self.game_stats.set_status(game_id, chat_id, new_status_translated)
+            self.games_changed([game_id])
+
+    def bulk_edit_game_attendance(self, chat_id: int, new_status: str, old_status: str = None,
+                                  start: datetime.datetime = None, end: datetime.datetime = None):
+        """change the attendance-state of a player for all matching future games with one update (one transaction)
+
+        Args:
+            chat_id (int): the chat_id of the player changing his attendance-state
+            new_status (str): new attendance-state (YES, NO, UNSURE)
+            old_status (str, optional): only change games with this attendance-state. Defaults to None (all).
+            start (datetime.datetime, optional): only change games at or after start. Defaults to None.
+            end (datetime.datetime, optional): only change games before end. Defaults to None.
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            int: number of changed games
+        """
+
+        player_column = f"p{chat_id}"
+        new_status_translated = util.translate_status_from_str(new_status)
+        # games already at new_status are neither updated nor logged
+        condition = f"DateTime > NOW() AND NOT ({player_column} <=> ?)"
+        parameters = [new_status_translated]
+        if old_status is not None:
+            condition += f" AND {player_column} = ?"
+            parameters.append(util.translate_status_from_str(old_status))
+        if start is not None:
+            condition += " AND DateTime >= ?"
+            parameters.append(start)
+        if end is not None:
+            condition += " AND DateTime < ?"
+            parameters.append(end)
+        mysql_statement = f"UPDATE Games SET {player_column} = ? WHERE {condition}"
+        # log the changes (for the response times in Analytics), before the update changes the matching rows
+        log_statement = f"INSERT INTO AttendanceLog(GameID, PlayerID, Status) " \
+                        f"SELECT ID, {int(chat_id)}, ? FROM Games WHERE {condition};"
+
+        def operation():
+            self.cursor.execute(log_statement, tuple([new_status_translated] + parameters))
+            self.cursor.execute(mysql_statement + ';', tuple([new_status_translated] + parameters))
+            return self.cursor.rowcount
+
+        try:
+            changed_games = self.run_with_retry(operation, f"{mysql_statement} with {parameters}")
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            if changed_games > 0:
+                self.games_changed()
+            return changed_games
 
     def update_player_state(self, chat_id: int, new_state: PlayerState):
         """update the state of a player in the database
@@ -640,6 +1305,29 @@ class DatabaseHandler(object):
         except NotifyUserException:
             raise NotifyUserException
 
+    def update_player_retired(self, chat_id: int, retired: bool):
+        """retire a player (or bring him back): retired players are not listed as unsure and get no reminders
+
+        Args:
+            chat_id (int): chat_id of player to change
+            retired (bool): new value of the retired flag
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+        """
+
+        mysql_statement = f"UPDATE Players SET Retired = {bool(retired)} WHERE ID = {int(chat_id)};"
+        try:
+            self.execute_mysql_without_result(mysql_statement, 0)
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            self.identities.set_retired(chat_id, retired)
+            # the unsure-lists of all games change
+            self.game_stats.invalidate_rendered()
+            # cached game data listing the unsure players (e.g. games_on_day) is outdated
+            self.games_changed([])
+
     def update_spectator_state(self, chat_id: int, new_state: SpectatorState):
         """update the state of a spectator in the database
 
@@ -656,3 +1344,111 @@ class DatabaseHandler(object):
             self.execute_mysql_without_result(mysql_statement, 0)
         except NotifyUserException:
             raise NotifyUserException
+        else:
+            self.identities.set_approved(chat_id, new_state.value >= SpectatorState.DEFAULT.value)
+
+    def get_live_stats_messages(self, chat_id: int):
+        """get the live stats messages posted in a chat
+
+        Args:
+            chat_id (int): chat_id of the (group) chat
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            dict: map from game ID to message_id
+        """
+
+        mysql_statement = "SELECT GameID, MessageID FROM LiveStatsMessages WHERE ChatID = ?;"
+        try:
+            cursor = self.execute_mysql_with_result(mysql_statement, 0, (chat_id,))
+        except NotifyUserException:
+            raise NotifyUserException
+        else:
+            return {game_id: message_id for (game_id, message_id) in cursor}
+
+    def set_live_stats_message(self, game_id: int, chat_id: int, message_id: int):
+        """remember the live stats message of a game in a chat, replaces a previous one
+
+        Args:
+            game_id (int): ID of the game
+            chat_id (int): chat_id of the (group) chat
+            message_id (int): message_id of the posted stats
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+        """
+
+        mysql_statement = "INSERT INTO LiveStatsMessages(GameID, ChatID, MessageID) VALUES(?, ?, ?) " \
+                          "ON DUPLICATE KEY UPDATE MessageID = VALUES(MessageID);"
+        try:
+            self.execute_mysql_without_result(mysql_statement, 0, (game_id, chat_id, message_id))
+        except NotifyUserException:
+            raise NotifyUserException
+
+    def delete_live_stats_message(self, game_id: int, chat_id: int):
+        """forget the live stats message of a game in a chat, e.g. after the game was played
+
+        Args:
+            game_id (int): ID of the game
+            chat_id (int): chat_id of the (group) chat
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+        """
+
+        mysql_statement = "DELETE FROM LiveStatsMessages WHERE GameID = ? AND ChatID = ?;"
+        try:
+            self.execute_mysql_without_result(mysql_statement, 0, (game_id, chat_id))
+        except NotifyUserException:
+            raise NotifyUserException
+
+    def get_reminder_deliveries(self, game_ids: list):
+        """get the reminders already handled for the given games, from the delivery ledger (DataBase.ReminderLog)
+
+        Args:
+            game_ids (list): IDs of the games
+
+        Raises:
+            NotifyAdminException: if a database access fails, raise exception to notify admin
+
+        Returns:
+            dict: map from (PlayerID, GameID, ReminderWindow) to (Status, Attempts)
+        """
+
+        if len(game_ids) == 0:
+            return dict()
+        mysql_statement = f"SELECT PlayerID, GameID, ReminderWindow, Status, Attempts FROM ReminderLog " \
+                          f"WHERE GameID IN ({', '.join(str(int(game_id)) for game_id in game_ids)});"
+        try:
+            cursor = self.execute_mysql_with_result(mysql_statement, 0)
+        except NotifyUserException as nuException:
+            raise NotifyAdminException(nuException)
+        else:
+            return {(player_id, game_id, window): (status, attempts)
+                    for (player_id, game_id, window, status, attempts) in cursor}
+
+    def record_reminder_deliveries(self, reminders: list, status: str, error: str = None):
+        """record the outcome of sending reminders in the delivery ledger, one transaction for all reminders of a message
+
+        Args:
+            reminders (list): (PlayerID, GameID, ReminderWindow) of the reminders sent in one message
+            status (str): 'sent' or 'failed'
+            error (str, optional): error of a failed send. Defaults to None.
+
+        Raises:
+            NotifyAdminException: if a database access fails, raise exception to notify admin
+        """
+
+        def operation():
+            self.cursor.executemany(
+                "INSERT INTO ReminderLog(PlayerID, GameID, ReminderWindow, Status, Attempts, Error) "
+                "VALUES(?, ?, ?, ?, 1, ?) ON DUPLICATE KEY UPDATE Status = VALUES(Status), "
+                "Attempts = Attempts + 1, Error = VALUES(Error), UpdatedAt = CURRENT_TIMESTAMP;",
+                [(player_id, game_id, window, status, error) for (player_id, game_id, window) in reminders])
+
+        try:
+            self.run_with_retry(operation, f"recording {len(reminders)} reminder(s) as {status}")
+        except NotifyUserException as nuException:
+            raise NotifyAdminException(nuException)
@@ -0,0 +1,146 @@
+import csv
+import logging
+import tempfile
+
+import telepot
+
+from DatabaseHandler import DatabaseHandler
+
+# Telegram limit for the text of a message
+MAX_MESSAGE_LENGTH = 4096
+# exports bigger than this are spooled to a temporary file instead of memory
+SPOOL_MAX_SIZE = 1024 * 1024
+# kinds of export, see ExportHandler.get_rows
+EXPORT_KINDS = ['players', 'spectators', 'attendance']
+
+
+class LineWriter(object):
+    """file-like object for csv.writer: keeps the last written line only"""
+
+    def __init__(self):
+        self.line = ''
+
+    def write(self, line: str):
+        self.line = line
+
+
+def iter_csv_lines(header: list, rows):
+    """format rows as csv, one line at a time
+
+    Args:
+        header (list): column names
+        rows (iterable): tuples with the values of the columns
+
+    Yields:
+        str: csv line including the line terminator
+    """
+
+    line_writer = LineWriter()
+    writer = csv.writer(line_writer, lineterminator='\n')
+    if header is not None:
+        writer.writerow(header)
+        yield line_writer.line
+    for row in rows:
+        writer.writerow(row)
+        yield line_writer.line
+
+
+def iter_chunks(lines, max_length: int = MAX_MESSAGE_LENGTH):
+    """group lines into chunks of at most max_length characters, split only between lines (unless a line is too long)
+
+    Args:
+        lines (iterable): lines including the line terminator
+        max_length (int, optional): maximum length of a chunk. Defaults to MAX_MESSAGE_LENGTH.
+
+    Yields:
+        str: the chunks, e.g. the texts of the messages to send
+    """
+
+    chunk = []
+    length = 0
+    for line in lines:
+        while len(line) > max_length:
+            # a single line longer than a message: flush, then cut it
+            if length > 0:
+                yield ''.join(chunk)
+                (chunk, length) = ([], 0)
+            yield line[:max_length]
+            line = line[max_length:]
+        if length + len(line) > max_length:
+            yield ''.join(chunk)
+            (chunk, length) = ([], 0)
+        chunk.append(line)
+        length += len(line)
+    if length > 0:
+        yield ''.join(chunk)
+
+
+class ExportHandler(object):
+    def __init__(self, bot: telepot.Bot, db_handler: DatabaseHandler, _logger: logging.Logger):
+        """export Players, Spectators and the attendance matrix as csv to a document upload or to messages
+        the rows come from a buffered cursor (the shared connection is not held while sending to Telegram), the csv
+        is built line by line, without building the whole export as one string
+
+        Args:
+            bot (telepot.Bot): main bot, sends the export
+            db_handler (DatabaseHandler): DataBase Handler-instance
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        self.bot = bot
+        self.database_handler = db_handler
+        self.logger = _logger
+
+    def get_rows(self, kind: str):
+        """get header and rows of an export
+
+        Args:
+            kind (str): one of EXPORT_KINDS
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            (list, iterable): column names, rows
+        """
+
+        if kind == 'players':
+            return self.database_handler.iter_players()
+        elif kind == 'spectators':
+            return self.database_handler.iter_spectators()
+        return self.database_handler.iter_attendance_matrix()
+
+    def send_document(self, chat_id: int, kind: str):
+        """send an export as csv file
+
+        Args:
+            chat_id (int): chat_id to send the export to
+            kind (str): one of EXPORT_KINDS
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+        """
+
+        (header, rows) = self.get_rows(kind)
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+            line_count = 0
+            for line in iter_csv_lines(header, rows):
+                spool.write(line.encode('utf8'))
+                line_count += 1
+            spool.seek(0)
+            self.bot.sendDocument(chat_id, (f"{kind}.csv", spool), caption=f"{kind}: {line_count - 1} rows")
+
+    def send_messages(self, chat_id: int, kind: str):
+        """send an export as csv text, split into messages at line boundaries
+
+        Args:
+            chat_id (int): chat_id to send the export to
+            kind (str): one of EXPORT_KINDS
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+        """
+
+        (header, rows) = self.get_rows(kind)
+        for chunk in iter_chunks(iter_csv_lines(header, rows)):
+            self.bot.sendMessage(chat_id, chunk)
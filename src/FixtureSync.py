@@ -0,0 +1,131 @@
+import configparser
+import hashlib
+import io
+import logging
+import os
+import urllib.error
+import urllib.request
+
+import utility as util
+from DatabaseHandler import DatabaseHandler
+from exceptions import NotifyAdminException
+
+
+class FixtureSyncHandler(object):
+
+    def __init__(self, config: configparser.RawConfigParser, db_handler: DatabaseHandler, _logger: logging.Logger):
+        """initialize the fixture sync Handler: pulls the ics-feed with our games and applies changes to DataBase.Games
+
+        Args:
+            config (configparser.RawConfigParser): configuration file, section FixtureSync provides the source of the feed
+            db_handler (DatabaseHandler): DataBase Handler-instance
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        # initialize fields
+        self.source = config['FixtureSync'].get('source', '').strip()
+        self.interval_hours = config['FixtureSync'].getint('interval_hours', 6)
+        self.delete_missing = config['FixtureSync'].getboolean('delete_missing', False)
+        self.state_file = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                       config['FixtureSync'].get('state_file', 'fixture_sync.json'))
+        self.database_handler = db_handler
+        self.logger = _logger
+
+        # validators of the last successfully applied feed: content hash, ETag and Last-Modified
+        self.feed_state = self.load_feed_state()
+
+        self.logger.info('Fixture Sync Handler started')
+
+    def is_enabled(self):
+        """return whether a source for the feed is configured
+
+        Returns:
+            bool: sync enabled?
+        """
+
+        return self.source != ''
+
+    def load_feed_state(self):
+        """load the validators of the last applied feed, so an unchanged feed is skipped after a restart as well
+
+        Returns:
+            dict: with keys hash, etag, last_modified
+        """
+
+        feed_state = {'hash': None, 'etag': None, 'last_modified': None}
+        # no (readable) state: do a full sync
+        feed_state.update(util.load_json_state(self.state_file, self.logger) or {})
+        return feed_state
+
+    def save_feed_state(self):
+        """persist the validators of the last applied feed
+        """
+
+        util.save_json_state(self.state_file, self.feed_state, self.logger)
+
+    def fetch_feed(self):
+        """fetch the feed from the configured source, a local path or an http(s)-URL
+
+        Raises:
+            NotifyAdminException: if the feed can not be fetched
+
+        Returns:
+            (bytes, str, str): content of the feed (None if the server answered 304 Not Modified), ETag, Last-Modified
+        """
+
+        if not self.source.startswith(('http://', 'https://')):
+            try:
+                with open(self.source, 'rb') as file:
+                    return file.read(), None, None
+            except OSError as err:
+                raise NotifyAdminException(f"Reading the fixture feed {self.source} failed: {err}")
+
+        request = urllib.request.Request(self.source)
+        if self.feed_state['etag'] is not None:
+            request.add_header('If-None-Match', self.feed_state['etag'])
+        if self.feed_state['last_modified'] is not None:
+            request.add_header('If-Modified-Since', self.feed_state['last_modified'])
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return response.read(), response.headers.get('ETag'), response.headers.get('Last-Modified')
+        except urllib.error.HTTPError as err:
+            if err.code == 304:
+                return None, self.feed_state['etag'], self.feed_state['last_modified']
+            raise NotifyAdminException(f"Fetching the fixture feed {self.source} failed: {err}")
+        except (urllib.error.URLError, OSError) as err:
+            raise NotifyAdminException(f"Fetching the fixture feed {self.source} failed: {err}")
+
+    def sync(self):
+        """pull the feed and apply the changed events to DataBase.Games, skip if the feed did not change
+        moved games are updated in place, so their attendance is kept
+
+        Raises:
+            NotifyAdminException: if fetching the feed or writing the games fails
+
+        Returns:
+            dict: number of inserted, updated, unchanged, skipped (and deleted) games, None if the feed did not change
+        """
+
+        content, etag, last_modified = self.fetch_feed()
+        if content is None:
+            self.logger.info(f"fixture feed not modified (ETag {etag}), nothing to sync")
+            return None
+        content_hash = hashlib.sha256(content).hexdigest()
+        if content_hash == self.feed_state['hash']:
+            self.logger.info("fixture feed unchanged (same content hash), nothing to sync")
+            return None
+
+        # icalendar is only loaded once there is a feed to apply, not at startup
+        import ImportUtility as iUtil
+        skipped = []
+        events = list(iUtil.iter_events(io.BytesIO(content), skipped))
+        for reason in skipped:
+            self.logger.warning(f"fixture feed: skipping {reason}")
+        # a game whose event could not be parsed is not missing from the feed, do not delete it
+        counts = self.database_handler.upsert_games(events, delete_missing=self.delete_missing and len(skipped) == 0)
+        counts['skipped'] = len(skipped)
+        # only remember the feed once it has been applied
+        self.feed_state = {'hash': content_hash, 'etag': etag, 'last_modified': last_modified}
+        self.save_feed_state()
+        self.logger.info(f"fixture sync done: {counts}")
+        return counts
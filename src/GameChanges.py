@@ -0,0 +1,200 @@
+import configparser
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import telepot
+from telepot.exception import TelegramError
+
+import utility as util
+from DatabaseHandler import DatabaseHandler
+from GameStats import UNSURE, YES
+from exceptions import NotifyUserException
+
+
+class GameChangeHandler(object):
+    def __init__(self, config: configparser.RawConfigParser, bot: telepot.Bot, db_handler: DatabaseHandler,
+                 _logger: logging.Logger):
+        """detect games whose DateTime or Place changed (fixture sync, ics-import or edited by hand in the database)
+        and notify the players that did not say NO and the approved spectators
+        changes are found by comparing DataBase.Games with a snapshot (persisted, so changes while the bot was down are
+        found as well); all changes of one check are sent as one message per recipient, by a bounded pool of workers
+
+        Args:
+            config (configparser.RawConfigParser): configuration file, section GameChanges
+            bot (telepot.Bot): main bot, sends the notifications
+            db_handler (DatabaseHandler): DataBase Handler-instance
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        self.bot = bot
+        self.database_handler = db_handler
+        self.logger = _logger
+        self.enabled = config['GameChanges'].getboolean('enabled', True)
+        self.interval_minutes = config['GameChanges'].getint('interval_minutes', 5)
+        self.state_file = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                       config['GameChanges'].get('state_file', 'game_snapshot.json'))
+        # at most max_workers messages are sent at the same time, the rest waits in the queue of the pool
+        self.executor = ThreadPoolExecutor(max_workers=config['GameChanges'].getint('max_workers', 4),
+                                           thread_name_prefix='GameChanges')
+        # futures of the notifications not sent yet, waited for in stop()
+        self.pending = set()
+        self.lock = threading.Lock()
+        # game ID -> [DateTime, Place, Adversary] as of the last check
+        self.snapshot = self.load_snapshot()
+
+    def is_enabled(self):
+        """return whether changed games are notified
+
+        Returns:
+            bool: notifications enabled?
+        """
+
+        return self.enabled
+
+    def load_snapshot(self):
+        """load the snapshot of the last check
+
+        Returns:
+            dict: game ID -> [DateTime, Place, Adversary], None if there is no snapshot yet
+        """
+
+        snapshot = util.load_json_state(self.state_file, self.logger)
+        if snapshot is None:
+            return None
+        # json keys are strings
+        return {int(game_id): game for game_id, game in snapshot.items()}
+
+    def save_snapshot(self):
+        """persist the snapshot
+        """
+
+        util.save_json_state(self.state_file, self.snapshot, self.logger)
+
+    def check(self):
+        """compare DataBase.Games with the snapshot, queue the notifications of the changed games
+
+        Returns:
+            int: number of changed games
+        """
+
+        try:
+            games = {ID: [str(DateTime), Place, Adversary] for (ID, DateTime, Place, Adversary) in
+                     self.database_handler.get_game_schedule()}
+        except NotifyUserException:
+            self.logger.error("checking for changed games failed", exc_info=True)
+            return 0
+        if self.snapshot is None:
+            # first start: nothing to compare with
+            self.snapshot = games
+            self.save_snapshot()
+            return 0
+
+        changes = dict()
+        for game_id, game in games.items():
+            old_game = self.snapshot.get(game_id)
+            if old_game is not None and old_game[:2] != game[:2]:
+                changes[game_id] = (old_game, game)
+        if len(changes) > 0:
+            try:
+                messages = self.get_messages(changes)
+            except NotifyUserException:
+                # snapshot stays, the changes are found again on the next check
+                self.logger.error("loading the recipients of changed games failed", exc_info=True)
+                return 0
+            for chat_id, text in messages.items():
+                self.submit(chat_id, text)
+            self.logger.info(f"{len(changes)} game(s) changed, notifying {len(messages)} recipient(s)")
+        if games != self.snapshot:
+            self.snapshot = games
+            self.save_snapshot()
+        return len(changes)
+
+    def get_messages(self, changes: dict):
+        """assemble one message per recipient listing all changed games concerning the recipient
+
+        Args:
+            changes (dict): game ID -> (old [DateTime, Place, Adversary], new [DateTime, Place, Adversary])
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            dict: chat_id -> text of the notification
+        """
+
+        # changes made outside of the bot (by hand) did not invalidate the cached stats
+        self.database_handler.games_changed()
+        game_stats = self.database_handler.get_game_stats(list(changes))
+        spectators = self.database_handler.get_approved_spectators()
+
+        recipients = dict()
+        for game_id, (old_game, new_game) in sorted(changes.items(), key=lambda change: change[1][1][0]):
+            line = f"{new_game[2]}: {util.make_datetime_pretty_str(old_game[0])} | {old_game[1]}\n" \
+                   f"  -> {util.make_datetime_pretty_str(new_game[0])} | {new_game[1]}\n"
+            affected = set(spectators)
+            if game_id in game_stats:
+                members = game_stats[game_id].members
+                affected |= {chat_id for chat_id in members[YES] | members[UNSURE] if
+                             not self.database_handler.identities.is_retired(chat_id)}
+            for chat_id in affected:
+                recipients.setdefault(chat_id, []).append(line)
+        return {chat_id: "Heads up, the following games have been moved:\n" + ''.join(lines)
+                for chat_id, lines in recipients.items()}
+
+    def submit(self, chat_id: int, text: str):
+        """queue a notification, sent by the pool of workers
+
+        Args:
+            chat_id (int): chat_id of the recipient
+            text (str): text of the notification
+        """
+
+        future = self.executor.submit(self.send, chat_id, text)
+        with self.lock:
+            self.pending.add(future)
+        future.add_done_callback(self.sent)
+
+    def sent(self, future):
+        """forget a sent notification, called by the pool when it is done
+
+        Args:
+            future (Future): future of the notification
+        """
+
+        with self.lock:
+            self.pending.discard(future)
+
+    def send(self, chat_id: int, text: str):
+        """send a notification, runs in a worker of the pool
+
+        Args:
+            chat_id (int): chat_id of the recipient
+            text (str): text of the notification
+        """
+
+        try:
+            self.bot.sendMessage(chat_id, text)
+        except TelegramError as error:
+            self.logger.warning(f"notifying {chat_id} about changed games failed: {error.description}")
+        except Exception:
+            self.logger.error(f"notifying {chat_id} about changed games failed", exc_info=True)
+
+    def stop(self, timeout: float = 30.0):
+        """stop accepting notifications, wait until the queued ones are sent
+
+        Args:
+            timeout (float, optional): seconds to wait for the queued notifications. Defaults to 30.0.
+
+        Returns:
+            bool: were all notifications sent in time?
+        """
+
+        with self.lock:
+            pending = list(self.pending)
+        (done, not_done) = wait(pending, timeout=timeout)
+        for future in not_done:
+            future.cancel()
+        self.executor.shutdown(wait=False)
+        return len(not_done) == 0
@@ -0,0 +1,206 @@
+import threading
+
+import utility as util
+
+# attendance-states as stored in the player columns of DataBase.Games
+UNSURE = 0
+YES = 1
+NO = 2
+
+
+class GameStats(object):
+    def __init__(self, game_id: int, date_time, place: str, adversary: str):
+        """materialized attendance of one game: the chat_ids per attendance-state and the rendered summaries
+
+        Args:
+            game_id (int): ID of the game in DataBase.Games
+            date_time (datetime): DateTime of the game
+            place (str): Place of the game
+            adversary (str): Adversary of the game
+        """
+
+        self.game_id = game_id
+        self.date_time = date_time
+        self.place = place
+        self.adversary = adversary
+        # attendance-state -> chat_ids of the players with this state
+        self.members = {UNSURE: set(), YES: set(), NO: set()}
+        # incremented on every change of the attendance, lets callers detect changed stats
+        self.version = 0
+        self.long_summary = None
+        self.short_summary = None
+
+    def set_status(self, chat_id: int, status: int):
+        """move a player to the given attendance-state
+
+        Args:
+            chat_id (int): chat_id of the player
+            status (int): new attendance-state (0, 1, 2)
+        """
+
+        for members in self.members.values():
+            members.discard(chat_id)
+        self.members[status].add(chat_id)
+        self.invalidate()
+
+    def invalidate(self):
+        """drop the rendered summaries, e.g. after a change of the attendance or of a player name / retired flag
+        """
+
+        self.version += 1
+        self.long_summary = None
+        self.short_summary = None
+
+    def get_lists(self, player_chat_id_dict: dict):
+        """get the pretty-printed names per attendance-state in roster order, retired players are not listed as unsure
+
+        Args:
+            player_chat_id_dict (dict): map from chat_id to (pretty-printed name, retired)
+
+        Returns:
+            ([], [], []): names of the players with YES, NO and UNSURE
+        """
+
+        yes_list = []
+        no_list = []
+        unsure_list = []
+        for player, (name, retired) in player_chat_id_dict.items():
+            if player in self.members[YES]:
+                yes_list.append(name)
+            elif player in self.members[NO]:
+                no_list.append(name)
+            elif player in self.members[UNSURE] and not retired:
+                unsure_list.append(name)
+        return yes_list, no_list, unsure_list
+
+    def render(self, player_chat_id_dict: dict, short: bool = False):
+        """return the summary of the game, rendered only if the attendance changed since the last call
+
+        Args:
+            player_chat_id_dict (dict): map from chat_id to (pretty-printed name, retired)
+            short (bool, optional): one-line summary (for buttons) instead of the full MarkdownV2 text. Defaults to False.
+
+        Returns:
+            str: the summary of the game
+        """
+
+        if short:
+            if self.short_summary is None:
+                self.short_summary = self.render_short(player_chat_id_dict)
+            return self.short_summary
+        if self.long_summary is None:
+            self.long_summary = self.render_long(player_chat_id_dict)
+        return self.long_summary
+
+    def render_short(self, player_chat_id_dict: dict):
+        (yes_list, no_list, unsure_list) = self.get_lists(player_chat_id_dict)
+        pretty_summary = f"{len(yes_list)}Y / {len(no_list)}N / {len(unsure_list)}U"
+        pretty_datetime = util.make_datetime_pretty(self.date_time)
+        return f"{pretty_datetime} | {self.place} | {pretty_summary}"
+
+    def render_long(self, player_chat_id_dict: dict):
+        (yes_list, no_list, unsure_list) = self.get_lists(player_chat_id_dict)
+
+        # first row of result: pretty-printed game_infos
+        result = f"{util.make_datetime_pretty_md(self.date_time)} \\| {self.place} \\| {self.adversary}\n"
+
+        # total player count
+        player_count = len(yes_list) + len(no_list) + len(unsure_list)
+
+        # assemble result, loop over each list
+        result += f"\n  *Team / Yes \\({len(yes_list)}/{player_count}\\)*:\n"
+        if len(yes_list) > 0:
+            for yes_player in yes_list:
+                result += f"        {yes_player}\n"
+        else:
+            result += "        No one yet\\!\n"
+        if len(no_list) > 0:
+            result += f"\n  *No \\({len(no_list)}/{player_count}\\)*:\n"
+            for no_player in no_list:
+                result += f"        {no_player}\n"
+        if len(unsure_list) > 0:
+            result += f"\n  *Still Unsure \\({len(unsure_list)}/{player_count}\\)*:\n"
+            for unsure_player in unsure_list:
+                result += f"        {unsure_player}\n"
+        return result
+
+
+class GameStatsStore(object):
+    def __init__(self):
+        """materialized GameStats per game ID, loaded lazily from DataBase.Games and updated incrementally afterwards
+        """
+
+        self.games = dict()
+        self.lock = threading.Lock()
+
+    def get(self, game_id: int):
+        """get the GameStats of a game
+
+        Args:
+            game_id (int): ID of the game
+
+        Returns:
+            GameStats: the materialized stats, None if not loaded (yet)
+        """
+
+        with self.lock:
+            return self.games.get(game_id)
+
+    def load_row(self, game_id: int, row: tuple, player_list: list):
+        """materialize a game from its row in DataBase.Games
+
+        Args:
+            game_id (int): ID of the game
+            row (tuple): (DateTime, Place, Adversary, p..., p...), player columns in the order of player_list
+            player_list (list): chat_ids of the player columns in row
+
+        Returns:
+            GameStats: the materialized stats
+        """
+
+        game_stats = GameStats(game_id, row[0], row[1], row[2])
+        for (player, status) in zip(player_list, row[3:]):
+            if status in game_stats.members:
+                game_stats.members[status].add(player)
+        with self.lock:
+            self.games[game_id] = game_stats
+        return game_stats
+
+    def set_status(self, game_id: int, chat_id: int, status: int):
+        """apply an attendance change to the materialized game, if loaded
+
+        Args:
+            game_id (int): ID of the game
+            chat_id (int): chat_id of the player
+            status (int): new attendance-state
+        """
+
+        with self.lock:
+            if game_id in self.games and status in self.games[game_id].members:
+                self.games[game_id].set_status(chat_id, status)
+
+    def add_player(self, chat_id: int):
+        """add a new player to all materialized games, new player columns default to UNSURE
+
+        Args:
+            chat_id (int): chat_id of the new player
+        """
+
+        with self.lock:
+            for game_stats in self.games.values():
+                game_stats.set_status(chat_id, UNSURE)
+
+    def invalidate_rendered(self):
+        """drop the rendered summaries of all games, e.g. after a player was retired
+        """
+
+        with self.lock:
+            for game_stats in self.games.values():
+                game_stats.invalidate()
+
+    def clear(self):
+        """forget all materialized games, they are reloaded on the next access
+        """
+
+        with self.lock:
+            self.games.clear()
@@ -0,0 +1,143 @@
+import configparser
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+
+def sd_notify(state: str):
+    """send a notification to systemd (READY=1, WATCHDOG=1, STOPPING=1), no-op if not started by systemd
+
+    Args:
+        state (str): the notification, see sd_notify(3)
+
+    Returns:
+        bool: was the notification sent?
+    """
+
+    address = os.environ.get('NOTIFY_SOCKET')
+    if not address:
+        return False
+    if address.startswith('@'):
+        # abstract namespace socket
+        address = '\0' + address[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as notify_socket:
+            notify_socket.connect(address)
+            notify_socket.sendall(state.encode())
+    except OSError:
+        return False
+    return True
+
+
+def get_watchdog_interval():
+    """get the interval in which systemd expects WATCHDOG=1, half of WatchdogSec
+
+    Returns:
+        float: seconds between two watchdog notifications, None if the watchdog is not enabled
+    """
+
+    watchdog_usec = os.environ.get('WATCHDOG_USEC')
+    if not watchdog_usec:
+        return None
+    return int(watchdog_usec) / 1e6 / 2
+
+
+class HealthHandler(object):
+    def __init__(self, config: configparser.RawConfigParser, bot, _logger: logging.Logger):
+        """liveness and readiness of the bot: update loop, scheduler and database
+        served on localhost: GET /live, GET /ready -> 200 or 503 with a json body of the single checks
+
+        Args:
+            config (configparser.RawConfigParser): configuration file, section Health
+            bot (ZWTelegramBot): the bot to check
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        self.bot = bot
+        self.logger = _logger
+        self.port = config['Health'].getint('port', 8321)
+        # the long poll returns at least every poll_timeout seconds, the scheduler ticks every 10 seconds
+        self.max_poll_age = config['Health'].getint('max_poll_age', 120)
+        self.max_tick_age = config['Health'].getint('max_tick_age', 120)
+        # monotonic time of the last run of the scheduler in the main loop
+        self.last_tick = time.monotonic()
+        self.server = None
+
+    def tick(self):
+        """called by the main loop after each run of the scheduler
+        """
+
+        self.last_tick = time.monotonic()
+
+    def check_live(self):
+        """liveness: the update loop polls and the main loop (scheduler) ticks
+
+        Returns:
+            dict: name of the check -> passed?
+        """
+
+        now = time.monotonic()
+        update_loop = self.bot.update_loop
+        return {
+            'update_loop': update_loop is not None and update_loop.is_running() and
+                           now - update_loop.last_poll < self.max_poll_age,
+            'scheduler': now - self.last_tick < self.max_tick_age,
+        }
+
+    def check_ready(self):
+        """readiness: live, not shutting down and the database is reachable
+
+        Returns:
+            dict: name of the check -> passed?
+        """
+
+        checks = self.check_live()
+        checks['accepting'] = not self.bot.shutdown_event.is_set()
+        checks['database'] = checks['accepting'] and not self.bot.database_handler.circuit_breaker.is_open() and \
+            self.bot.database_handler.ping()
+        return checks
+
+    def start(self):
+        """serve /live and /ready on localhost in a background thread
+        """
+
+        health_handler = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/live':
+                    checks = health_handler.check_live()
+                elif self.path == '/ready':
+                    checks = health_handler.check_ready()
+                else:
+                    self.send_error(404)
+                    return
+                body = json.dumps(checks).encode()
+                self.send_response(200 if all(checks.values()) else 503)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # polled every few seconds, keep it out of the log
+                pass
+
+        try:
+            self.server = HTTPServer(('127.0.0.1', self.port), RequestHandler)
+        except OSError:
+            self.logger.error(f"health endpoint not started, port {self.port} not available", exc_info=True)
+            return
+        threading.Thread(target=self.server.serve_forever, name='HealthServer', daemon=True).start()
+        self.logger.info(f"Health endpoint listening on 127.0.0.1:{self.port}")
+
+    def stop(self):
+        """stop serving the health endpoint
+        """
+
+        if self.server is not None:
+            self.server.shutdown()
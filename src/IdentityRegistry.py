@@ -0,0 +1,164 @@
+import sys
+
+# roles of a chat_id, see IdentityRegistry.get_role
+ADMIN = 'admin'
+PLAYER = 'player'
+SPECTATOR = 'spectator'
+
+
+def get_display_name(firstname: str, lastname: str):
+    """name as shown in the stats: 'Max M\\.' (escaped for MarkdownV2), interned so all rendered stats share it
+
+    Args:
+        firstname (str): first name
+        lastname (str): last name
+
+    Returns:
+        str: the display name
+    """
+
+    return sys.intern(f"{firstname} {lastname[:1]}\\.")
+
+
+class IdentityRegistry(object):
+    def __init__(self, admin_lookup=None):
+        """who is who, served from memory: players (with retired flag), spectators and admins
+        filled from DataBase.Players / DataBase.Spectators at startup, kept up to date by every insert / update of them
+
+        Args:
+            admin_lookup (function, optional): chat_id -> is admin? (RuntimeConfigStore.is_admin). Defaults to None.
+        """
+
+        # chat_id -> (display name, retired), shared as DatabaseHandler.player_chat_id_dict (roster order)
+        self.players = dict()
+        # chat_id -> display name (pending, approved and refused)
+        self.spectators = dict()
+        # chat_ids of the approved spectators (State >= SpectatorState.DEFAULT)
+        self.approved_spectators = set()
+        self.admin_lookup = admin_lookup
+
+    def add_player(self, chat_id: int, name: str, retired: bool = False):
+        """add (or replace) a player, after it was inserted into DataBase.Players
+
+        Args:
+            chat_id (int): chat_id of the player
+            name (str): display name, see get_display_name
+            retired (bool, optional): retired flag. Defaults to False.
+        """
+
+        self.players[chat_id] = (name, bool(retired))
+
+    def add_spectator(self, chat_id: int, name: str, approved: bool = False):
+        """add (or replace) a spectator, after it was inserted into DataBase.Spectators
+
+        Args:
+            chat_id (int): chat_id of the spectator
+            name (str): display name, see get_display_name
+            approved (bool, optional): approved by the maintainer? Defaults to False.
+        """
+
+        self.spectators[chat_id] = name
+        self.set_approved(chat_id, approved)
+
+    def set_approved(self, chat_id: int, approved: bool):
+        """change whether a spectator is approved, after the state was changed in DataBase.Spectators
+
+        Args:
+            chat_id (int): chat_id of the spectator
+            approved (bool): approved by the maintainer?
+        """
+
+        if approved:
+            self.approved_spectators.add(chat_id)
+        else:
+            self.approved_spectators.discard(chat_id)
+
+    def set_retired(self, chat_id: int, retired: bool):
+        """change the retired flag of a player, after it was changed in DataBase.Players
+
+        Args:
+            chat_id (int): chat_id of the player
+            retired (bool): new value of the retired flag
+        """
+
+        self.players[chat_id] = (self.players[chat_id][0], bool(retired))
+
+    def is_player(self, chat_id: int):
+        """check whether chat_id is in DataBase.Players
+
+        Args:
+            chat_id (int): chat_id to check
+
+        Returns:
+            bool: is a player?
+        """
+
+        return chat_id in self.players
+
+    def is_spectator(self, chat_id: int):
+        """check whether chat_id is in DataBase.Spectators (pending, approved or refused)
+
+        Args:
+            chat_id (int): chat_id to check
+
+        Returns:
+            bool: is a spectator?
+        """
+
+        return chat_id in self.spectators
+
+    def is_admin(self, chat_id: int):
+        """check whether chat_id may use the admin commands (admin_chat_ids in api.ini)
+
+        Args:
+            chat_id (int): chat_id to check
+
+        Returns:
+            bool: is admin?
+        """
+
+        return self.admin_lookup is not None and self.admin_lookup(chat_id)
+
+    def is_retired(self, chat_id: int):
+        """check whether chat_id is a retired player
+
+        Args:
+            chat_id (int): chat_id to check
+
+        Returns:
+            bool: is a retired player?
+        """
+
+        return chat_id in self.players and self.players[chat_id][1]
+
+    def get_role(self, chat_id: int):
+        """get the role of chat_id, admin before player before spectator
+
+        Args:
+            chat_id (int): chat_id to check
+
+        Returns:
+            str: ADMIN, PLAYER, SPECTATOR or None if unknown (pending and refused spectators included)
+        """
+
+        if self.is_admin(chat_id):
+            return ADMIN
+        if chat_id in self.players:
+            return PLAYER
+        if chat_id in self.approved_spectators:
+            return SPECTATOR
+        return None
+
+    def get_name(self, chat_id: int):
+        """get the display name of a player or spectator
+
+        Args:
+            chat_id (int): chat_id of the player or spectator
+
+        Returns:
+            str: the display name, None if unknown
+        """
+
+        if chat_id in self.players:
+            return self.players[chat_id][0]
+        return self.spectators.get(chat_id)
@@ -1,21 +1,102 @@
 import icalendar
 
+# name of our own team as it appears in the summary of the handball.ch ics-export
+TEAM_NAME = 'züri west handball 1'
 
-def parse_file(file):
-    res = []
-    icalfile = open(file, 'rb')
-    gcal = icalendar.Calendar.from_ical(icalfile.read())
-    for component in gcal.walk():
-        if component.name == "VEVENT":
-            summary = component.get('summary')
-            description = component.get('description')
-            location = component.get('location')
-            startdt = component.get('dtstart').dt
-            enddt = component.get('dtend').dt
-            exdate = component.get('exdate')
-            dateTime = startdt.strftime("%Y-%m-%d %H:%M:%S")
-            adv = summary.split(' - ')[1] if summary.split(' - ')[2] == 'züri west handball 1' else summary.split(' - ')[2]
-            temp = f"INSERT INTO Games(DateTime, Place, Adversary) VALUES('{dateTime}', '{location}', '{adv}');"
-            res.append(temp)
-    icalfile.close()
-    return res
+
+def iter_vevent_blocks(lines):
+    """split an iterable of ics-lines into the raw text of its VEVENT components, one at a time
+
+    Args:
+        lines (iterable): lines of an ics-file (str or bytes), e.g. an open file object
+
+    Yields:
+        str: the raw text of one VEVENT, from BEGIN:VEVENT to END:VEVENT
+    """
+
+    block = None
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        stripped = line.rstrip('\r\n')
+        if stripped == 'BEGIN:VEVENT':
+            block = [stripped]
+        elif block is not None:
+            block.append(stripped)
+            if stripped == 'END:VEVENT':
+                yield '\r\n'.join(block) + '\r\n'
+                block = None
+
+
+def parse_event(vevent: str):
+    """parse the raw text of a single VEVENT into the fields needed for DataBase.Games
+
+    Args:
+        vevent (str): raw text of one VEVENT
+
+    Raises:
+        ValueError: if the event is not a game, e.g. no start or a summary not in the format of a game
+
+    Returns:
+        dict: with keys uid, dateTime (format 2020-09-05 17:30:00), place and adversary
+    """
+
+    component = icalendar.Event.from_ical(vevent)
+    summary = str(component.get('summary'))
+    location = str(component.get('location', 'TBA'))
+    startdt = component.get('dtstart')
+    if startdt is None:
+        raise ValueError(f"event '{summary}' has no start")
+    dateTime = startdt.dt.strftime("%Y-%m-%d %H:%M:%S")
+    # summary has the format "<league> - <home team> - <guest team>", the adversary is the other team
+    split = summary.split(' - ')
+    if len(split) < 3:
+        raise ValueError(f"event '{summary}' is not a game")
+    adv = split[1] if split[2].lower() == TEAM_NAME else split[2]
+    # fall back to a key derived from the fixture itself if the feed does not provide a UID
+    uid = component.get('uid')
+    uid = str(uid) if uid is not None else f"{dateTime}|{adv}"
+    return {'uid': uid, 'dateTime': dateTime, 'place': location, 'adversary': adv}
+
+
+def iter_events(lines, skipped: list = None):
+    """stream all events of an ics-file, without loading the whole calendar into memory
+    events that are not games (e.g. a training weekend in the feed) are skipped
+
+    Args:
+        lines (iterable): lines of an ics-file (str or bytes), e.g. an open file object
+        skipped (list, optional): collects the reason for every skipped event. Defaults to None.
+
+    Yields:
+        dict: one parsed event, see parse_event()
+    """
+
+    for vevent in iter_vevent_blocks(lines):
+        try:
+            event = parse_event(vevent)
+        except ValueError as err:
+            if skipped is not None:
+                skipped.append(str(err))
+            continue
+        yield event
+
+
+def import_file(file, database_handler):
+    """import (insert or update) all games of an ics-file into DataBase.Games
+
+    Args:
+        file (str): path to the ics-file
+        database_handler (DatabaseHandler): DataBase Handler-instance used to write the games
+
+    Raises:
+        NotifyAdminException: if writing the games to the database fails
+
+    Returns:
+        dict: number of inserted, updated, unchanged and skipped games
+    """
+
+    skipped = []
+    with open(file, 'rb') as icalfile:
+        counts = database_handler.upsert_games(iter_events(icalfile, skipped))
+    counts['skipped'] = len(skipped)
+    return counts
@@ -0,0 +1,161 @@
+import datetime
+import logging
+import threading
+
+import telepot
+from telepot.exception import TelegramError
+
+from ConfigStore import RuntimeConfigStore
+from DatabaseHandler import DatabaseHandler
+from exceptions import NotifyUserException
+
+LIVE_STATS_HEADER = 'The stats for our game are \\(updated live\\):\n'
+
+
+class LiveStatsHandler(object):
+    def __init__(self, bot: telepot.Bot, db_handler: DatabaseHandler, config_store: RuntimeConfigStore,
+                 _logger: logging.Logger):
+        """one stats message per upcoming game in the group chat, edited in place whenever the attendance of the game
+        changes instead of posting the full stats again
+
+        Args:
+            bot (telepot.Bot): main bot
+            db_handler (DatabaseHandler): DataBase Handler-instance
+            config_store (RuntimeConfigStore): api.ini, provides the group_chat_id the stats are posted in
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        self.bot = bot
+        self.database_handler = db_handler
+        self.config_store = config_store
+        self.logger = _logger
+        self.lock = threading.RLock()
+        # chat the tracked messages are in, follows group_chat_id of api.ini (see follow_chat)
+        self.chat_id = None
+        # game ID -> message_id of the live message, survives restarts via DataBase.LiveStatsMessages
+        self.messages = dict()
+        # game ID -> (GameStats, version) the message was last rendered from, unknown after a restart
+        self.rendered = dict()
+        self.follow_chat()
+
+    def follow_chat(self):
+        """switch to the live messages of the current group chat if group_chat_id was changed in api.ini,
+        the messages in the previous chat are left as they are
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+        """
+
+        with self.lock:
+            chat_id = int(self.config_store.get('API', 'group_chat_id'))
+            if chat_id == self.chat_id:
+                return
+            messages = self.database_handler.get_live_stats_messages(chat_id)
+            if self.chat_id is not None:
+                self.logger.info(f"live stats move from chat {self.chat_id} to {chat_id}")
+            (self.chat_id, self.messages, self.rendered) = (chat_id, messages, dict())
+
+    def get_message_id(self, game_id: int):
+        """get the message_id of the live message of a game
+
+        Args:
+            game_id (int): ID of the game
+
+        Returns:
+            int: message_id, None if there is no live message for the game
+        """
+
+        self.follow_chat()
+        return self.messages.get(game_id)
+
+    def post(self, game_id: int):
+        """post the live message of a game, or bring the existing one up to date
+
+        Args:
+            game_id (int): ID of the game
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            int: message_id of the live message
+        """
+
+        with self.lock:
+            self.follow_chat()
+            if game_id in self.messages and self.update(game_id):
+                return self.messages[game_id]
+            game_stats = self.database_handler.get_game_stats([game_id]).get(game_id)
+            if game_stats is None:
+                raise NotifyUserException(f"Game {game_id} not found")
+            version = game_stats.version
+            text = LIVE_STATS_HEADER + game_stats.render(self.database_handler.player_chat_id_dict)
+            sent = self.bot.sendMessage(self.chat_id, text, parse_mode='MarkdownV2')
+            self.messages[game_id] = sent['message_id']
+            self.rendered[game_id] = (game_stats, version)
+            self.database_handler.set_live_stats_message(game_id, self.chat_id, sent['message_id'])
+            return sent['message_id']
+
+    def update(self, game_id: int):
+        """edit the live message of a game if its attendance changed since it was last rendered
+
+        Args:
+            game_id (int): ID of the game
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            bool: does the live message still exist?
+        """
+
+        game_stats = self.database_handler.get_game_stats([game_id]).get(game_id)
+        if game_stats is None or game_stats.date_time < datetime.datetime.now():
+            # deleted or played: leave the message as it is, stop tracking it
+            self.forget(game_id)
+            return False
+        version = game_stats.version
+        # the stats are rematerialized (new object) after bulk changes, compare the object too
+        if self.rendered.get(game_id) == (game_stats, version):
+            return True
+        text = LIVE_STATS_HEADER + game_stats.render(self.database_handler.player_chat_id_dict)
+        try:
+            self.bot.editMessageText((self.chat_id, self.messages[game_id]), text, parse_mode='MarkdownV2')
+        except TelegramError as error:
+            if 'message is not modified' not in str(error.description):
+                # e.g. the message was deleted in the chat
+                self.logger.warning(f"editing live stats of game {game_id} failed: {error.description}")
+                self.forget(game_id)
+                return False
+        self.rendered[game_id] = (game_stats, version)
+        return True
+
+    def forget(self, game_id: int):
+        """stop tracking the live message of a game
+
+        Args:
+            game_id (int): ID of the game
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+        """
+
+        self.messages.pop(game_id, None)
+        self.rendered.pop(game_id, None)
+        self.database_handler.delete_live_stats_message(game_id, self.chat_id)
+
+    def refresh(self):
+        """bring all live messages up to date, only games whose attendance changed are rendered and edited
+        """
+
+        with self.lock:
+            try:
+                self.follow_chat()
+            except NotifyUserException:
+                self.logger.error("loading the live stats of the group chat failed", exc_info=True)
+                return
+            for game_id in list(self.messages):
+                try:
+                    self.update(game_id)
+                except NotifyUserException:
+                    self.logger.error(f"refreshing live stats of game {game_id} failed", exc_info=True)
@@ -0,0 +1,93 @@
+import logging
+
+from exceptions import NotifyAdminException
+
+# Ordered list of all schema migrations: (version, description, statements)
+# never change an applied migration, append a new one instead
+# MariaDB commits DDL implicitly, so every statement has to be safe to re-run (IF NOT EXISTS)
+MIGRATIONS = [
+    (1, 'Games.UID: key of the ics-event a game was imported from', [
+        "ALTER TABLE Games ADD COLUMN IF NOT EXISTS UID VARCHAR(255) DEFAULT NULL;",
+        "CREATE UNIQUE INDEX IF NOT EXISTS games_uid ON Games (UID);",
+    ]),
+    (2, 'GamesArchive: finished games, same columns as Games', [
+        "CREATE TABLE IF NOT EXISTS GamesArchive LIKE Games;",
+    ]),
+    (3, 'indexes for the queries on upcoming games and pending spectators', [
+        "CREATE INDEX IF NOT EXISTS games_datetime ON Games (DateTime);",
+        "CREATE INDEX IF NOT EXISTS games_archive_datetime ON GamesArchive (DateTime);",
+        "CREATE INDEX IF NOT EXISTS spectators_state ON Spectators (State);",
+    ]),
+    (4, 'AttendanceLog: every change of an attendance-state with its time', [
+        "CREATE TABLE IF NOT EXISTS AttendanceLog(GameID INT NOT NULL, PlayerID BIGINT NOT NULL, Status INT NOT NULL, "
+        "ChangedAt DATETIME DEFAULT CURRENT_TIMESTAMP, INDEX attendance_log_game_player (GameID, PlayerID));",
+    ]),
+    (5, 'LiveStatsMessages: stats message per game and chat, edited in place on changes', [
+        "CREATE TABLE IF NOT EXISTS LiveStatsMessages(GameID INT NOT NULL, ChatID BIGINT NOT NULL, "
+        "MessageID BIGINT NOT NULL, PRIMARY KEY (GameID, ChatID));",
+    ]),
+    (6, 'ReminderLog: delivery ledger of the reminders per player, game and reminder window', [
+        "CREATE TABLE IF NOT EXISTS ReminderLog(PlayerID BIGINT NOT NULL, GameID INT NOT NULL, "
+        "ReminderWindow INT NOT NULL, Status VARCHAR(16) NOT NULL, Attempts INT NOT NULL DEFAULT 0, "
+        "Error VARCHAR(255) DEFAULT NULL, UpdatedAt DATETIME DEFAULT CURRENT_TIMESTAMP, "
+        "PRIMARY KEY (PlayerID, GameID, ReminderWindow), INDEX reminder_log_game (GameID));",
+    ]),
+    (7, 'keyset pagination of the game lists on (DateTime, ID), replaces games_datetime', [
+        "CREATE INDEX IF NOT EXISTS games_datetime_id ON Games (DateTime, ID);",
+        "DROP INDEX IF EXISTS games_datetime ON Games;",
+    ]),
+]
+
+
+def get_schema_version(cursor):
+    """get the version of the latest applied migration, create the SchemaVersion-Table if missing
+
+    Args:
+        cursor (mariadb.connection.cursor): cursor of the database connection
+
+    Returns:
+        int: version of the schema, 0 if no migration was applied yet
+    """
+
+    cursor.execute("CREATE TABLE IF NOT EXISTS SchemaVersion(Version INT PRIMARY KEY, Description VARCHAR(255), "
+                   "AppliedAt DATETIME DEFAULT CURRENT_TIMESTAMP);")
+    cursor.execute("SELECT MAX(Version) FROM SchemaVersion;")
+    (version,) = cursor.fetchone()
+    return 0 if version is None else version
+
+
+def apply_migrations(connection, _logger: logging.Logger):
+    """apply all migrations newer than the current schema version, in order
+
+    Args:
+        connection (mariadb.connection): connection to the database
+        _logger (logging.Logger): logger instance, the same over all modules, log to same file
+
+    Raises:
+        NotifyAdminException: if a migration fails, the schema stays at the last successful version
+
+    Returns:
+        int: the schema version after migrating
+    """
+
+    cursor = connection.cursor()
+    try:
+        version = get_schema_version(cursor)
+        for (migration_version, description, statements) in MIGRATIONS:
+            if migration_version <= version:
+                continue
+            _logger.info(f"Applying migration {migration_version}: {description}")
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute("INSERT INTO SchemaVersion(Version, Description) VALUES(?, ?);",
+                           (migration_version, description))
+            connection.commit()
+            version = migration_version
+    except Exception as err:
+        _logger.error(f"Migration failed: {err}", exc_info=True)
+        connection.rollback()
+        raise NotifyAdminException(f"Schema migration failed: {err}")
+    finally:
+        cursor.close()
+    _logger.info(f"Database schema at version {version}")
+    return version
@@ -19,6 +19,7 @@ class PlayerState(Enum):
 
     EDIT_CHOOSE_GAME = 200
     EDIT_GAME = 201
+    EDIT_BULK = 202
 
     GROUP_CHAT = -42
 
@@ -0,0 +1,210 @@
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+
+import telepot
+
+# number of entries per ranking in the reports
+REPORT_TOP = 15
+# reports longer than this are sent as file, Telegram messages are limited to 4096 characters
+MAX_MESSAGE_LENGTH = 3500
+
+
+class ProfilerHandler(object):
+    def __init__(self, bot: telepot.Bot, _logger: logging.Logger):
+        """on-demand profiling of the running bot, started by an admin with /profile:
+        cProfile over the next N handled updates, tracemalloc snapshots over a time window
+
+        Args:
+            bot (telepot.Bot): main bot, sends the reports
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        self.bot = bot
+        self.logger = _logger
+        self.lock = threading.Lock()
+        # cProfile session: profile, number of updates still to profile, chat_id to report to
+        self.profile = None
+        self.remaining_updates = 0
+        self.profile_chat_id = None
+        # tracemalloc session: first snapshot, chat_id to report to
+        self.memory_snapshot = None
+        self.memory_chat_id = None
+
+    def wrap(self, function):
+        """wrap an update handler, so its calls are profiled while a cProfile session is running
+
+        Args:
+            function (function): handler of the update loop
+
+        Returns:
+            function: the wrapped handler
+        """
+
+        @functools.wraps(function)
+        def wrapper(msg):
+            with self.lock:
+                profile = self.profile
+            if profile is None:
+                return function(msg)
+            try:
+                return profile.runcall(function, msg)
+            finally:
+                self.update_handled()
+
+        return wrapper
+
+    def start_profile(self, chat_id: int, updates: int):
+        """profile the next handled updates with cProfile
+
+        Args:
+            chat_id (int): chat_id of the admin the report is sent to
+            updates (int): number of updates to profile
+
+        Returns:
+            bool: started? False if a session is already running
+        """
+
+        with self.lock:
+            if self.profile is not None:
+                return False
+            self.profile = cProfile.Profile()
+            self.remaining_updates = updates
+            self.profile_chat_id = chat_id
+        self.logger.info(f"profiling the next {updates} updates for {chat_id}")
+        return True
+
+    def update_handled(self):
+        """count a profiled update, send the report after the last one
+        """
+
+        with self.lock:
+            if self.profile is None:
+                return
+            self.remaining_updates -= 1
+            if self.remaining_updates > 0:
+                return
+            (profile, chat_id) = (self.profile, self.profile_chat_id)
+            self.profile = None
+        self.send_report(chat_id, 'profile.txt', self.get_profile_report(profile))
+
+    def get_profile_report(self, profile: cProfile.Profile):
+        """rank the profiled functions by cumulative time and by number of calls
+
+        Args:
+            profile (cProfile.Profile): the finished profile
+
+        Returns:
+            str: the report
+        """
+
+        report = ''
+        for (sort_key, title) in [('cumulative', 'cumulative time'), ('ncalls', 'number of calls')]:
+            stream = io.StringIO()
+            stats = pstats.Stats(profile, stream=stream)
+            stats.strip_dirs().sort_stats(sort_key).print_stats(REPORT_TOP)
+            report += f"Top {REPORT_TOP} functions by {title}:\n{stream.getvalue()}\n"
+        return report
+
+    def start_memory(self, chat_id: int, seconds: int):
+        """trace allocations with tracemalloc for a time window, report the allocation sites that grew the most
+
+        Args:
+            chat_id (int): chat_id of the admin the report is sent to
+            seconds (int): length of the time window
+
+        Returns:
+            bool: started? False if a session is already running
+        """
+
+        with self.lock:
+            if self.memory_snapshot is not None:
+                return False
+            tracemalloc.start()
+            self.memory_snapshot = tracemalloc.take_snapshot()
+            self.memory_chat_id = chat_id
+        timer = threading.Timer(seconds, self.stop_memory)
+        timer.daemon = True
+        timer.start()
+        self.logger.info(f"tracing allocations for {seconds}s for {chat_id}")
+        return True
+
+    def stop_memory(self):
+        """take the second snapshot, stop tracing and send the report
+        """
+
+        with self.lock:
+            if self.memory_snapshot is None:
+                return
+            snapshot = tracemalloc.take_snapshot()
+            (first_snapshot, chat_id) = (self.memory_snapshot, self.memory_chat_id)
+            self.memory_snapshot = None
+            (current, peak) = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        differences = snapshot.compare_to(first_snapshot, 'lineno')
+        report = f"Traced memory: {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n"
+        for (sort_key, title) in [(lambda stat: abs(stat.size_diff), 'size'),
+                                  (lambda stat: abs(stat.count_diff), 'number of blocks')]:
+            report += f"\nTop {REPORT_TOP} allocation sites by {title}:\n"
+            for stat in sorted(differences, key=sort_key, reverse=True)[:REPORT_TOP]:
+                report += f"{stat}\n"
+        self.send_report(chat_id, 'memory.txt', report)
+
+    def send_report(self, chat_id: int, filename: str, report: str):
+        """send a report as message, or as file if it is too long for a message
+
+        Args:
+            chat_id (int): chat_id of the admin
+            filename (str): name of the file, if sent as file
+            report (str): the report
+        """
+
+        try:
+            if len(report) <= MAX_MESSAGE_LENGTH:
+                self.bot.sendMessage(chat_id, report)
+            else:
+                self.bot.sendDocument(chat_id, (filename, io.BytesIO(report.encode())),
+                                      caption=report[:report.index('\n')])
+        except Exception:
+            self.logger.error(f"sending {filename} to {chat_id} failed", exc_info=True)
+
+
+class StartupTimeline(object):
+    def __init__(self, start: float = None):
+        """time spent per phase of the startup (imports, config, database connect, state load, ...)
+
+        Args:
+            start (float, optional): time.perf_counter() at the start of the first phase. Defaults to now.
+        """
+
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        # (phase, seconds) in the order of the startup
+        self.phases = []
+
+    def mark(self, phase: str):
+        """end a phase, the next one starts now
+
+        Args:
+            phase (str): name of the phase that ended
+        """
+
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def get_report(self):
+        """report the phases and the total time
+
+        Returns:
+            str: the report
+        """
+
+        lines = [f"{phase}: {seconds:.3f}s" for (phase, seconds) in self.phases]
+        lines.append(f"total: {self.last - self.start:.3f}s")
+        return 'startup ' + ', '.join(lines)
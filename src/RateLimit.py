@@ -0,0 +1,160 @@
+import configparser
+import logging
+import threading
+import time
+
+import telepot
+from telepot.exception import TelegramError
+
+from IdentityRegistry import IdentityRegistry, ADMIN, PLAYER, SPECTATOR
+
+# role of chat_ids not in the registry (strangers, not approved yet)
+UNKNOWN = 'unknown'
+# idle buckets are dropped once there are more of them
+MAX_BUCKETS = 1000
+
+
+class TokenBucket(object):
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        """token bucket: capacity tokens at most, refilled with rate tokens per second, one token per update
+
+        Args:
+            rate (float): tokens per second
+            capacity (float): burst size
+        """
+
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        """add the tokens earned since the last refill
+        """
+
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """take a token if there is one
+
+        Returns:
+            bool: token taken, e.g. update allowed?
+        """
+
+        self.refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def is_full(self):
+        """check whether the bucket is full again, e.g. the chat was idle long enough
+
+        Returns:
+            bool: full?
+        """
+
+        self.refill()
+        return self.tokens >= self.capacity
+
+
+class RateLimiter(object):
+    def __init__(self, config: configparser.RawConfigParser, bot: telepot.Bot, identities: IdentityRegistry,
+                 _logger: logging.Logger):
+        """flood protection in front of the handlers: a token bucket per sender with limits by role and a global one
+        updates over the limit are dropped before any handler work, the sender gets a single notice until it slows down;
+        admins and the chatter in group chats are not limited by the global bucket, so a busy group does not starve
+        the private chats; pending and refused spectators get the limits of unknown senders
+
+        Args:
+            config (configparser.RawConfigParser): configuration file, section RateLimit
+            bot (telepot.Bot): main bot, sends the notice
+            identities (IdentityRegistry): role of a chat_id
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        self.bot = bot
+        self.identities = identities
+        self.logger = _logger
+        section = config['RateLimit']
+        self.enabled = section.getboolean('enabled', True)
+        # role -> (tokens per second, burst), configured as updates per minute
+        self.limits = dict()
+        for (role, per_minute, burst) in [(ADMIN, 120, 30), (PLAYER, 30, 10), (SPECTATOR, 20, 8), (UNKNOWN, 6, 3)]:
+            self.limits[role] = (section.getfloat(f"{role}_per_minute", per_minute) / 60,
+                                 section.getfloat(f"{role}_burst", burst))
+        self.global_bucket = TokenBucket(section.getfloat('global_per_second', 10),
+                                         section.getfloat('global_burst', 30))
+        # sender chat_id -> TokenBucket
+        self.buckets = dict()
+        # senders that got the notice and have not slowed down yet
+        self.throttled = set()
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def get_bucket(self, chat_id: int, role: str):
+        """get the bucket of a sender, the limits follow the role (e.g. a spectator that was approved)
+
+        Args:
+            chat_id (int): chat_id of the sender
+            role (str): role of the sender
+
+        Returns:
+            TokenBucket: the bucket
+        """
+
+        (rate, capacity) = self.limits[role]
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            if len(self.buckets) >= MAX_BUCKETS:
+                self.buckets = {sender: bucket for sender, bucket in self.buckets.items() if not bucket.is_full()}
+                self.throttled &= set(self.buckets)
+            bucket = self.buckets[chat_id] = TokenBucket(rate, capacity)
+        elif bucket.rate != rate or bucket.capacity != capacity:
+            bucket.refill()
+            (bucket.rate, bucket.capacity) = (rate, capacity)
+            bucket.tokens = min(bucket.tokens, capacity)
+        return bucket
+
+    def allow(self, sender_id: int, notify_chat_id: int = None):
+        """check whether an update of a sender may be handled, take a token
+
+        Args:
+            sender_id (int): chat_id of the sender
+            notify_chat_id (int, optional): chat to send the notice to when throttled, None for group chats (not
+            charged to the global bucket either). Defaults to None.
+
+        Returns:
+            bool: handle the update?
+        """
+
+        if not self.enabled:
+            return True
+        role = self.identities.get_role(sender_id) or UNKNOWN
+        with self.lock:
+            bucket = self.get_bucket(sender_id, role)
+            if sender_id in self.throttled and bucket.is_full():
+                # slowed down, the next flood gets a notice again
+                self.throttled.discard(sender_id)
+            if not bucket.take():
+                self.dropped += 1
+                notify = notify_chat_id is not None and sender_id not in self.throttled
+                self.throttled.add(sender_id)
+            elif role != ADMIN and notify_chat_id is not None and not self.global_bucket.take():
+                # the bot is flooded as a whole, not by this sender: give the token back, no notice
+                bucket.tokens += 1
+                self.dropped += 1
+                notify = False
+            else:
+                return True
+        self.logger.info(f"throttled update of {sender_id} ({role})")
+        if notify:
+            try:
+                self.bot.sendMessage(notify_chat_id, "Slow down please, I am ignoring your messages for a moment.")
+            except TelegramError as error:
+                self.logger.info(f"throttle notice to {notify_chat_id} failed: {error.description}")
+        return False
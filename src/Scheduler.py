@@ -8,16 +8,20 @@ import configparser
 from datetime import date
 
 from DatabaseHandler import DatabaseHandler
+from ConfigStore import RuntimeConfigStore
 from exceptions import NotifyAdminException, NotifyUserException
 
+# unsure players are reminded of a game 4, 5, 6 and 13 days before it
+REMINDER_WINDOWS = [4, 5, 6, 13]
+
 
 class SchedulerHandler(object):
 
-    def __init__(self, config: configparser.RawConfigParser, bot: telepot.Bot, db_handler: DatabaseHandler, _logger: logging.Logger):
+    def __init__(self, config_store: RuntimeConfigStore, bot: telepot.Bot, db_handler: DatabaseHandler, _logger: logging.Logger):
         """initialize the scheduler Handler
 
         Args:
-            config (configparser.RawConfigParser): configuration file to get group and admin chat_id
+            config_store (RuntimeConfigStore): api.ini to get group and admin chat_id (read on every use, hot reloaded)
             bot (telepot.Bot): main bot, used to send messages to admin in case of error
             db_handler (DatabaseHandler): DataBase Handler-instance
             _logger (logging.Logger): logger instance, the same over all modules, log to same file
@@ -25,18 +29,29 @@ class SchedulerHandler(object):
 
         # initialize fields
         self.bot = bot
-        self.group_id = config['API']['group_chat_id']
-        self.maintainer_chat_id = config['API']['maintainer_chat_id']
+        self.config_store = config_store
         self.database_handler = db_handler
         self.logger = _logger
 
         # since server restarts every 24hours, send error to admin if more than 24 hours up
         schedule.every(24).hours.do(self.send_reboot_failure)
 
+        # keep the database connection alive (and reconnect it if broken) while the bot is idle
+        schedule.every(self.database_handler.ping_interval).seconds.do(self.database_handler.ping)
+
         # init complete
         self.logger.info('Scheduler Handler started')
 
 
+    @property
+    def group_id(self):
+        return self.config_store.get('API', 'group_chat_id')
+
+    @property
+    def maintainer_chat_id(self):
+        return self.config_store.get('API', 'maintainer_chat_id')
+
+
     def send_reboot_failure(self):
         """send a message to the admin that reboot has failed
         """
@@ -44,44 +59,24 @@ class SchedulerHandler(object):
 
 
     def load_schedules(self):
-        """Iterates through all Games in 5/6/7/14 days and returns a list of chat_ids of players that indicated UNSURE in any of the Games
+        """Iterates through all Games in 4/5/6/13 days (REMINDER_WINDOWS) and returns a list of chat_ids of players that indicated UNSURE in any of the Games
+
+        Raises:
+            NotifyAdminException: if a database access fails, raise exception to notify admin
 
         Returns:
-            dict(): a dictionary from chat_ids to lists of game infos ([game_date, game_place, game_adversary])
+            dict(): a dictionary from chat_ids to lists of (game infos ([game_date, game_adversary, game_place, game_id]), reminder window)
         """
-        try:
-            # get the games_lists
-            five_days_games_list = self.database_handler.get_games_in_exactly_x_days(4)
-            six_days_games_list = self.database_handler.get_games_in_exactly_x_days(5)
-            seven_days_games_list = self.database_handler.get_games_in_exactly_x_days(6)
-            fourteen_days_games_list = self.database_handler.get_games_in_exactly_x_days(13)
-
-            player_to_messages_map = dict()
-        except NotifyAdminException:
-            self.bot.sendMessage(self.maintainer_chat_id, 'Getting the 5 days game did not work, no schedules set for today')
-        else:
+        player_to_messages_map = dict()
+        # the reminder window (days until the game) is part of the key in the delivery ledger
+        for window in REMINDER_WINDOWS:
             # loop over games_lists, append all unsure players to player_to_messages_map
-            for (game_info_list, unsure_players_list) in five_days_games_list:
-                for unsure_player in unsure_players_list:
-                    if unsure_player not in player_to_messages_map:
-                        player_to_messages_map[unsure_player] = []
-                    player_to_messages_map[unsure_player].append(game_info_list)
-            for (game_info_list, unsure_players_list) in six_days_games_list:
-                for unsure_player in unsure_players_list:
-                    if unsure_player not in player_to_messages_map:
-                        player_to_messages_map[unsure_player] = []
-                    player_to_messages_map[unsure_player].append(game_info_list)
-            for (game_info_list, unsure_players_list) in seven_days_games_list:
-                for unsure_player in unsure_players_list:
-                    if unsure_player not in player_to_messages_map:
-                        player_to_messages_map[unsure_player] = []
-                    player_to_messages_map[unsure_player].append(game_info_list)
-            for (game_info_list, unsure_players_list) in fourteen_days_games_list:
+            for (game_info_list, unsure_players_list) in self.database_handler.get_games_in_exactly_x_days(window):
                 for unsure_player in unsure_players_list:
                     if unsure_player not in player_to_messages_map:
                         player_to_messages_map[unsure_player] = []
-                    player_to_messages_map[unsure_player].append(game_info_list)
-            return player_to_messages_map
+                    player_to_messages_map[unsure_player].append((game_info_list, window))
+        return player_to_messages_map
  
 
     def send_reminder_at_8am(self, function):
@@ -102,6 +97,53 @@ class SchedulerHandler(object):
         schedule.every().day.at("22:00").do(function)
 
 
+    def sync_fixtures(self, function, hours: int):
+        """schedule function every x hours
+
+        Args:
+            function (function): function to be scheduled every x hours
+            hours (int): interval in hours
+        """
+        schedule.every(hours).hours.do(function)
+
+
+    def archive_games(self, function):
+        """schedule function at 3am
+
+        Args:
+            function (function): function to be scheduled at 3am
+        """
+        schedule.every().day.at("03:00").do(function)
+
+
+    def watch_config(self, function):
+        """schedule function every 30 seconds
+
+        Args:
+            function (function): function to be scheduled every 30 seconds
+        """
+        schedule.every(30).seconds.do(function)
+
+
+    def refresh_live_stats(self, function):
+        """schedule function every minute
+
+        Args:
+            function (function): function to be scheduled every minute
+        """
+        schedule.every().minute.do(function)
+
+
+    def check_game_changes(self, function, minutes: int):
+        """schedule function every x minutes
+
+        Args:
+            function (function): function to be scheduled every x minutes
+            minutes (int): interval in minutes
+        """
+        schedule.every(minutes).minutes.do(function)
+
+
     def run_schedule(self):
         """function looped in ZWTelegramBot to run scheduled jobs
         """
@@ -2,10 +2,13 @@ from PlayerState import PlayerState
 
 
 class StateObject(object):
+    # one instance per player: no __dict__, the state is a shared enum member
+    __slots__ = ('state', 'game_number', 'spectator_id', 'retired')
+
     def __init__(self, player_state: PlayerState, _retired: bool = False):
         self.state = PlayerState(player_state)
         self.game_number = -1
         self.spectator_id = -1
-        self.retired = _retired
+        self.retired = bool(_retired)
         # ADD game fields
 
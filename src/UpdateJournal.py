@@ -0,0 +1,180 @@
+import configparser
+import json
+import logging
+import os
+import time
+
+import telepot
+
+
+class UpdateJournal(object):
+    def __init__(self, config: configparser.RawConfigParser, _logger: logging.Logger):
+        """append-only journal of the inbound updates: every update is recorded before it is handled and marked done
+        afterwards, the polling offset is derived from it, so a restart resumes exactly where the bot left off
+        one json object per line: {"type": "received", "update_id", "time", "update"}, {"type": "done", "update_id"},
+        {"type": "offset", "offset"} (first line after a rotation)
+
+        Args:
+            config (configparser.RawConfigParser): configuration file, section Journal
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        self.logger = _logger
+        self.path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 config['Journal'].get('path', 'updates.journal'))
+        self.max_bytes = config['Journal'].getint('max_bytes', 5 * 1024 * 1024)
+        self.backups = config['Journal'].getint('backups', 5)
+        # fsync every received update: survives a power loss, costs a write to the sd card per update
+        self.fsync = config['Journal'].getboolean('fsync', True)
+        # update_id of the next update to fetch from Telegram
+        self.offset = None
+        # update_id -> update of the updates received but not handled (crash while handling)
+        self.pending = dict()
+        self.load()
+        self.file = open(self.path, 'a', encoding='utf8')
+
+    def load(self):
+        """read the journal: offset and the updates not handled yet, a torn last line (crash while writing) is ignored
+        """
+
+        if not os.path.exists(self.path):
+            return
+        for record in read_records(self.path, self.logger):
+            if record['type'] == 'offset':
+                self.offset = record['offset']
+            elif record['type'] == 'received':
+                self.pending[record['update_id']] = record['update']
+                self.offset = max(self.offset or 0, record['update_id'] + 1)
+            elif record['type'] == 'done':
+                self.pending.pop(record['update_id'], None)
+        if len(self.pending) > 0:
+            self.logger.warning(f"journal: {len(self.pending)} update(s) received but not handled, replaying them")
+        self.logger.info(f"journal: resuming at offset {self.offset}")
+
+    def append(self, record: dict, sync: bool = False):
+        """append a record to the journal
+
+        Args:
+            record (dict): the record
+            sync (bool, optional): fsync the file (if enabled). Defaults to False.
+        """
+
+        self.file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.file.flush()
+        if sync and self.fsync:
+            os.fsync(self.file.fileno())
+
+    def record_received(self, update: dict):
+        """record an update before it is handled
+
+        Args:
+            update (dict): the update as returned by getUpdates
+        """
+
+        self.append({'type': 'received', 'update_id': update['update_id'], 'time': time.time(), 'update': update},
+                    sync=True)
+        self.pending[update['update_id']] = update
+        self.offset = update['update_id'] + 1
+
+    def record_done(self, update_id: int):
+        """mark an update as handled, rotate the journal if it is too big
+
+        Args:
+            update_id (int): update_id of the handled update
+        """
+
+        self.append({'type': 'done', 'update_id': update_id})
+        self.pending.pop(update_id, None)
+        if len(self.pending) == 0 and self.file.tell() > self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """keep the full journal as path.1 (path.1 -> path.2, ...) for offline replays, start a new one with the offset
+        """
+
+        self.file.close()
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self.file = open(self.path, 'w', encoding='utf8')
+        self.append({'type': 'offset', 'offset': self.offset}, sync=True)
+        self.logger.info(f"journal rotated at offset {self.offset}")
+
+    def close(self):
+        """close the journal file
+        """
+
+        self.file.close()
+
+
+def read_records(path: str, _logger: logging.Logger = None):
+    """read the records of a journal file
+
+    Args:
+        path (str): path to the journal
+        _logger (logging.Logger, optional): logs skipped (torn) lines. Defaults to None.
+
+    Yields:
+        dict: the records in the order they were written
+    """
+
+    with open(path, encoding='utf8') as journal_file:
+        for line in journal_file:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                if _logger is not None:
+                    _logger.warning(f"journal {path}: skipping torn line")
+
+
+def replay_journal(paths: list, dispatch, speed: float = 0.0):
+    """replay the received updates of journal files, e.g. against a test database to reproduce production load
+
+    Args:
+        paths (list): journal files, oldest first (e.g. updates.journal.2, updates.journal.1, updates.journal)
+        dispatch (function): handles one update, e.g. UpdateLoop.dispatch
+        speed (float, optional): 1.0 keeps the original pace, 2.0 twice as fast, 0 as fast as possible. Defaults to 0.0.
+
+    Returns:
+        (int, float): number of replayed updates, seconds spent handling them
+    """
+
+    count = 0
+    handling_time = 0.0
+    previous_time = None
+    for path in paths:
+        for record in read_records(path):
+            if record['type'] != 'received':
+                continue
+            if speed > 0 and previous_time is not None:
+                time.sleep(max(0.0, (record['time'] - previous_time) / speed))
+            previous_time = record['time']
+            start = time.perf_counter()
+            dispatch(record['update'])
+            handling_time += time.perf_counter() - start
+            count += 1
+    return count, handling_time
+
+
+class DryRunBot(telepot.Bot):
+    def __init__(self, token: str, _logger: logging.Logger):
+        """bot that logs the requests to Telegram instead of sending them, used to replay journals offline
+
+        Args:
+            token (str): not used for requests, required by telepot.Bot
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+        """
+
+        super().__init__(token)
+        self.logger = _logger
+        self.message_id = 0
+
+    def _api_request(self, method, params=None, files=None, **kwargs):
+        self.logger.debug(f"dry run: {method} {params}")
+        self.message_id += 1
+        if method == 'getUpdates':
+            return []
+        # enough of a Message / ChatMember for the handlers
+        return {'message_id': self.message_id, 'status': 'member'}
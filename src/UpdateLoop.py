@@ -0,0 +1,269 @@
+import collections
+import logging
+import threading
+import time
+
+import telepot
+from telepot.exception import TelegramError
+
+from RateLimit import RateLimiter
+from UpdateJournal import UpdateJournal
+
+# update types routed to the chat handler (same as telepot's 'chat' flavor)
+CHAT_UPDATES = ['message', 'edited_message', 'channel_post', 'edited_channel_post']
+# number of recently handled updates remembered to drop re-deliveries
+SEEN_UPDATES_SIZE = 1000
+
+
+class SeenUpdates(object):
+    def __init__(self, size: int = SEEN_UPDATES_SIZE):
+        """bounded memory of the recently handled updates: ring buffer (oldest key is forgotten first) and a set for
+        the lookup
+
+        Args:
+            size (int, optional): number of keys remembered. Defaults to SEEN_UPDATES_SIZE.
+        """
+
+        self.ring = collections.deque(maxlen=size)
+        self.keys = set()
+
+    def add(self, key):
+        """remember a key
+
+        Args:
+            key (tuple): key of an update, see get_keys
+
+        Returns:
+            bool: False if the key was seen already
+        """
+
+        if key in self.keys:
+            return False
+        if len(self.ring) == self.ring.maxlen:
+            self.keys.discard(self.ring[0])
+        self.ring.append(key)
+        self.keys.add(key)
+        return True
+
+
+def get_keys(update: dict):
+    """keys identifying an update: its update_id and the message it carries, per chat (edits are new messages)
+    a re-delivered update has the same update_id, a message re-sent under a new update_id the same message key
+
+    Args:
+        update (dict): the update as returned by getUpdates
+
+    Returns:
+        list: the keys
+    """
+
+    keys = [('update', update['update_id'])]
+    for key in CHAT_UPDATES:
+        if key in update:
+            message = update[key]
+            keys.append(('message', message['chat']['id'], message['message_id'], message.get('edit_date')))
+            return keys
+    if 'callback_query' in update:
+        keys.append(('callback_query', update['callback_query']['id']))
+    return keys
+
+
+def get_sender(update: dict):
+    """get the sender of an update and the chat to answer a throttled sender in
+
+    Args:
+        update (dict): the update as returned by getUpdates
+
+    Returns:
+        (int, int): chat_id of the sender (None if unknown), chat_id of the private chat (None for groups / channels)
+    """
+
+    for key in CHAT_UPDATES + ['callback_query']:
+        if key in update:
+            message = update[key]
+            sender_id = message['from']['id'] if 'from' in message else None
+            if key == 'callback_query':
+                return sender_id, sender_id
+            return sender_id, message['chat']['id'] if message['chat']['type'] == 'private' else None
+    return None, None
+
+
+class UpdateLoop(object):
+    def __init__(self, bot: telepot.Bot, handlers: dict, _logger: logging.Logger, poll_timeout: int = 20,
+                 journal: UpdateJournal = None, rate_limiter: RateLimiter = None):
+        """long-polling loop for getUpdates, replaces telepot's message_loop so intake can be stopped and drained
+
+        Args:
+            bot (telepot.Bot): main bot
+            handlers (dict): flavor ('chat', 'callback_query') -> function handling the message
+            _logger (logging.Logger): logger instance, the same over all modules, log to same file
+            poll_timeout (int, optional): seconds a getUpdates long poll waits for updates. Defaults to 20.
+            journal (UpdateJournal, optional): records every update before and after handling it. Defaults to None.
+            rate_limiter (RateLimiter, optional): drops the updates of flooding senders. Defaults to None.
+        """
+
+        self.bot = bot
+        self.handlers = handlers
+        self.logger = _logger
+        self.poll_timeout = poll_timeout
+        self.journal = journal
+        # update_id of the next update to fetch, confirms all updates before it to Telegram
+        self.offset = None if journal is None else journal.offset
+        # monotonic time of the last successful getUpdates, used by the health check
+        self.last_poll = time.monotonic()
+        # number of updates currently being handled
+        self.in_flight = 0
+        # re-deliveries (after timeouts or restarts) are dropped before any handler work
+        self.seen_updates = SeenUpdates()
+        self.duplicates = 0
+        self.rate_limiter = rate_limiter
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='UpdateLoop', daemon=True)
+
+    def start(self):
+        """start polling in a background thread
+        """
+
+        self.thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """stop intake: no new getUpdates, wait until the current batch of updates is handled
+
+        Args:
+            timeout (float, optional): seconds to wait for the running batch. Defaults to 30.0.
+
+        Returns:
+            bool: was the loop drained in time?
+        """
+
+        self.stop_event.set()
+        self.thread.join(timeout)
+        drained = not self.thread.is_alive()
+        if drained and self.offset is not None:
+            # confirm the handled updates, so Telegram does not deliver them again after the restart
+            try:
+                self.bot.getUpdates(offset=self.offset, limit=1, timeout=0)
+            except (TelegramError, OSError):
+                self.logger.warning("confirming the last updates failed", exc_info=True)
+        if drained and self.journal is not None:
+            self.journal.close()
+        return drained
+
+    def is_running(self):
+        """return whether the polling thread is alive
+
+        Returns:
+            bool: polling thread alive?
+        """
+
+        return self.thread.is_alive()
+
+    def run(self):
+        """poll for updates until stop() is called, dispatch each update to its handler
+        """
+
+        if self.journal is not None:
+            # updates received before a crash, but not handled
+            for update_id in sorted(self.journal.pending):
+                if self.stop_event.is_set():
+                    return
+                self.dispatch(self.journal.pending[update_id])
+                self.journal.record_done(update_id)
+        failures = 0
+        while not self.stop_event.is_set():
+            try:
+                updates = self.bot.getUpdates(offset=self.offset, timeout=self.poll_timeout)
+            except Exception:
+                # network error or Telegram unavailable: back off, but stay responsive to stop()
+                failures += 1
+                self.logger.warning("getUpdates failed", exc_info=True)
+                self.stop_event.wait(min(60, 2 ** failures))
+                continue
+            failures = 0
+            self.last_poll = time.monotonic()
+            for update in updates:
+                if self.offset is not None and update['update_id'] < self.offset:
+                    # confirmed before, Telegram delivered it again
+                    self.duplicates += 1
+                    continue
+                if self.journal is not None:
+                    self.journal.record_received(update)
+                self.dispatch(update)
+                if self.journal is not None:
+                    self.journal.record_done(update['update_id'])
+                self.offset = update['update_id'] + 1
+
+    def dispatch(self, update: dict):
+        """hand a single update to the matching handler, errors are logged and do not stop the loop
+
+        Args:
+            update (dict): the update as returned by getUpdates
+        """
+
+        if not self.is_new(update) or not self.is_allowed(update):
+            return
+        self.in_flight += 1
+        try:
+            for key in CHAT_UPDATES:
+                if key in update:
+                    self.handlers['chat'](update[key])
+                    return
+            if 'callback_query' in update:
+                self.handlers['callback_query'](update['callback_query'])
+            else:
+                self.logger.info(f"ignoring update {update['update_id']}: {list(update.keys())}")
+        except Exception:
+            self.logger.error(f"handling update {update['update_id']} failed", exc_info=True)
+        finally:
+            self.in_flight -= 1
+
+    def is_new(self, update: dict):
+        """check whether an update was not handled yet, remember it
+
+        Args:
+            update (dict): the update as returned by getUpdates
+
+        Returns:
+            bool: not seen before?
+        """
+
+        try:
+            keys = get_keys(update)
+        except (KeyError, TypeError):
+            # unexpected shape, let the handler deal with it
+            return True
+        # all keys are remembered, even if the first one already was a duplicate
+        new = [self.seen_updates.add(key) for key in keys]
+        if all(new):
+            return True
+        self.duplicates += 1
+        self.logger.info(f"dropping duplicate update {update['update_id']}")
+        return False
+
+    def is_allowed(self, update: dict):
+        """check the rate limit of the sender of an update, a dropped callback query is still answered,
+        so the button of the sender stops spinning
+
+        Args:
+            update (dict): the update as returned by getUpdates
+
+        Returns:
+            bool: handle the update?
+        """
+
+        if self.rate_limiter is None:
+            return True
+        try:
+            (sender_id, notify_chat_id) = get_sender(update)
+        except (KeyError, TypeError):
+            return True
+        if sender_id is None:
+            return True
+        if self.rate_limiter.allow(sender_id, notify_chat_id):
+            return True
+        if 'callback_query' in update:
+            try:
+                self.bot.answerCallbackQuery(update['callback_query']['id'], text='Slow down please')
+            except TelegramError as error:
+                self.logger.info(f"answering throttled callback query failed: {error.description}")
+        return False
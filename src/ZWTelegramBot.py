@@ -3,25 +3,44 @@ import datetime
 import logging
 import os
 import re
+import signal
 import sys
+import threading
 import time
 from logging.handlers import TimedRotatingFileHandler
 
+# start of the startup timeline: the imports below are its first phase
+STARTUP_START = time.perf_counter()
+
 import mariadb
 import telepot
 import utility as util
-import ImportUtility as iUtil
 
-from DatabaseHandler import DatabaseHandler
+from DatabaseHandler import DatabaseHandler, PREVIOUS_PAGE, NEXT_PAGE
 from PlayerState import PlayerState
 from SpectatorState import SpectatorState
 from StateObject import StateObject
 from Scheduler import SchedulerHandler
+from FixtureSync import FixtureSyncHandler
+from GameChanges import GameChangeHandler
+from LiveStats import LiveStatsHandler
+from Profiler import ProfilerHandler, StartupTimeline
+from CalendarFeed import CalendarFeedHandler, TEAM_FEED
+from UpdateLoop import UpdateLoop
+from RateLimit import RateLimiter
+from UpdateJournal import UpdateJournal, DryRunBot, replay_journal
+from Health import HealthHandler, sd_notify, get_watchdog_interval
+from ConfigStore import RuntimeConfigStore
 from exceptions import NotifyUserException, NotifyAdminException
+from telepot.exception import TelegramError
 from telepot.namedtuple import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove, InlineKeyboardMarkup, \
     InlineKeyboardButton
 
 
+# a reminder that failed this often (e.g. the player blocked the bot) is not retried anymore
+MAX_REMINDER_ATTEMPTS = 3
+
+
 # static methods
 def get_names(msg: dict):
     # Access first and last name, check if exists to avoid dict-key error
@@ -35,14 +54,14 @@ def get_names(msg: dict):
 
 
 def init_database_handler(bot: telepot.Bot, db_config: configparser.RawConfigParser,
-                          api_config: configparser.RawConfigParser, _logger: logging.Logger,
+                          config_store: RuntimeConfigStore, _logger: logging.Logger,
                           maintainer_chat_id: int):
     """initialize the DataBase Handler, retry 10 times on error, notify administrator otherwise and exit
 
     Args:
         bot (telepot.Bot): bot, used to notify the admin
         db_config (configparser.RawConfigParser):  provides the login credentials to the database
-        api_config (configparser.RawConfigParser): provides the maintainer_chat_id
+        config_store (RuntimeConfigStore): api.ini, provides the maintainer_chat_id
         _logger (logging.Logger): provides the logging facilities
         maintainer_chat_id (int): provide the maintainer_chat_id to the bot
 
@@ -53,7 +72,7 @@ def init_database_handler(bot: telepot.Bot, db_config: configparser.RawConfigPar
     count = 0
     while count < 10:
         try:
-            database_handler = DatabaseHandler(bot, db_config, api_config, _logger)
+            database_handler = DatabaseHandler(bot, db_config, config_store, _logger)
             count = 10
         except mariadb.Error as err:
             time.sleep(1)
@@ -62,46 +81,42 @@ def init_database_handler(bot: telepot.Bot, db_config: configparser.RawConfigPar
                 bot.sendMessage(maintainer_chat_id, f"ERROR: starting DB - BOT NOT RUNNING{err}")
                 sys.exit(1)
         except NotifyAdminException as err:
-            bot.sendMessage(maintainer_chat_id, f"ERROR: starting DB - BOT NOT RUNNING{err}")
+            # connection or schema migration failed, retry as well
+            time.sleep(1)
+            count += 1
+            if count > 9:
+                bot.sendMessage(maintainer_chat_id, f"ERROR: starting DB - BOT NOT RUNNING{err}")
+                sys.exit(1)
         else:
             return database_handler
 
 
-def init_admin_chat_ids(admin_chat_id: str):
-    """load the admin_chat_ids saved in api_config to list for faster access
-
-    Returns:
-        list: A List containing all chat id's allowed to exchange admin-messages with the bot
-    """
-    admin_chat_list = []
-    admin_chat_id_split = admin_chat_id.split(',')
-    for admin_id in admin_chat_id_split:
-        admin_chat_list.append(int(admin_id))
-    return admin_chat_list
-
-
 class ZWTelegramBot(object):
 
-    def __init__(self, config: configparser.RawConfigParser, api_config: configparser.RawConfigParser,
-                 db_config: configparser.RawConfigParser, _logger: logging.Logger):
+    def __init__(self, config: configparser.RawConfigParser, config_store: RuntimeConfigStore,
+                 db_config: configparser.RawConfigParser, _logger: logging.Logger, dry_run: bool = False,
+                 timeline: StartupTimeline = None):
         """initialize main class with bot, start all Handlers
 
         Args:
             config (configparser.RawConfigParser): configuration file for bot
-            api_config (configparser.RawConfigParser): configuration file with secrets (Bot Token, maintainer_chat_id)
+            config_store (RuntimeConfigStore): configuration file with secrets (Bot Token, maintainer_chat_id),
+            admin_chat_ids, changeable at runtime
             db_config (configparser.RawConfigParser): configuration file for database handler
             _logger (logging.Logger): logger instance, will be passed to databaseHandler and scheduleHandler
             -> one logger for all classes
+            dry_run (bool, optional): log the requests to Telegram instead of sending them (journal replays).
+            Defaults to False.
+            timeline (StartupTimeline, optional): the phases of the startup are recorded in it. Defaults to a new one.
         """
 
         # initialize fields
         self.config = config
-        self.api_config = api_config
-        self.maintainer_chat_id = int(self.api_config["API"]["maintainer_chat_id"])
-        self.group_chat_id = int(self.api_config["API"]["group_chat_id"])
-        self.group_chat_id2 = int(self.api_config["API"]["group_chat_id2"])
-        self.admin_chat_ids = init_admin_chat_ids(self.api_config["API"]["admin_chat_ids"])
+        # api.ini is hot reloaded: values are read through config_store on every use, never kept
+        self.config_store = config_store
         self.add_infos_dict = dict()  # dict from chat_id to list: [dateTime, Place, Opponent]
+        self.game_list_pages = dict()  # dict from chat_id to (page, page_keys) of the game list shown last
+        self.startup_timeline = StartupTimeline() if timeline is None else timeline
 
         # initialize logger 
         self.logger = _logger
@@ -109,62 +124,201 @@ class ZWTelegramBot(object):
         self.logger.info("Logger started")
 
         # start Bot
-        self.bot = telepot.Bot(self.api_config["API"]["key"])
+        if dry_run:
+            self.bot = DryRunBot(self.config_store.get('API', 'key'), _logger)
+        else:
+            self.bot = telepot.Bot(self.config_store.get('API', 'key'))
+        # polling of updates, started in start(); set on SIGTERM to shut down gracefully
+        self.update_loop = None
+        self.shutdown_event = threading.Event()
 
         # start DataBase Handler
-        self.database_handler = init_database_handler(self.bot, db_config, api_config, _logger,
+        self.database_handler = init_database_handler(self.bot, db_config, self.config_store, _logger,
                                                       self.maintainer_chat_id)
+        self.startup_timeline.mark('database connect')
+
+        # who is player / spectator / admin, from memory; admins are configured in api.ini
+        self.identities = self.database_handler.identities
+        self.identities.admin_lookup = self.config_store.is_admin
 
         # initialize lists / dicts
         self.user_state_map = self.database_handler.init_user_state_map()
         self.spectator_state_map = self.database_handler.init_spectator_state_map()
+        self.startup_timeline.mark('state load')
 
         # start Scheduler Handler
-        self.scheduler_handler = SchedulerHandler(api_config, self.bot, self.database_handler, _logger)
+        self.scheduler_handler = SchedulerHandler(self.config_store, self.bot, self.database_handler, _logger)
         # self.scheduler_handler.send_reminder_at_8am(self.send_reminders)
         # self.scheduler_handler.send_stats_to_group_chat(self.send_stats_to_group_chat)
 
-        # adding games manually via ics, to delete
+        self.scheduler_handler.archive_games(self.archive_games)
+        # stats message per upcoming game in the group chat, edited in place when the attendance changes
+        self.live_stats_handler = LiveStatsHandler(self.bot, self.database_handler, self.config_store, _logger)
+        self.scheduler_handler.refresh_live_stats(self.live_stats_handler.refresh)
+        # pick up changes of api.ini (admin_chat_ids, chat_ids) without restart
+        self.scheduler_handler.watch_config(self.config_store.reload_if_changed)
+
+        # start Fixture Sync Handler, keeps DataBase.Games in sync with the ics-feed of our fixtures
+        self.fixture_sync_handler = FixtureSyncHandler(config, self.database_handler, _logger)
+        if self.fixture_sync_handler.is_enabled():
+            self.scheduler_handler.sync_fixtures(self.sync_fixtures, self.fixture_sync_handler.interval_hours)
+
+        # notify players and spectators about moved games (DateTime / Place changed by a sync, import or by hand)
+        self.game_change_handler = GameChangeHandler(config, self.bot, self.database_handler, _logger)
+        if self.game_change_handler.is_enabled():
+            self.scheduler_handler.check_game_changes(self.game_change_handler.check,
+                                                      self.game_change_handler.interval_minutes)
+
+        # attendance analytics over all seasons and csv exports for admins, created (and imported) on first use
+        self.analytics_handler = None
+        self.export_handler = None
+
+        # ics-feeds of the games (team and per player), tokens derived from calendar_secret (default: bot token)
+        calendar_secret = self.config_store.get('API', 'calendar_secret', fallback=self.config_store.get('API', 'key'))
+        self.calendar_feed_handler = CalendarFeedHandler(config, calendar_secret, self.database_handler, _logger)
+
+        # on-demand cProfile / tracemalloc sessions, started by an admin with /profile
+        self.profiler_handler = ProfilerHandler(self.bot, _logger)
+
+        # liveness / readiness endpoint on localhost
+        self.health_handler = HealthHandler(config, self, _logger)
+
+        self.startup_timeline.mark('handlers')
+
+        # adding games manually via ics: inserts new and updates moved games, returns the counts
+        # import ImportUtility as iUtil
         # path = os.path.join('ics', 'someFile.ics')
-        # sql_statements = iUtil.parse_file(path)
-        # for sql_stat in sql_statements:
-        #     self.database_handler.execute_mysql_without_result(sql_stat, 0)
+        # self.logger.info(iUtil.import_file(path, self.database_handler))
+
+    def get_analytics_handler(self):
+        """get the analytics handler, created on first use: numpy is only imported when /analytics is used
+
+        Returns:
+            AnalyticsHandler: the analytics handler
+        """
+        if self.analytics_handler is None:
+            from Analytics import AnalyticsHandler
+            self.analytics_handler = AnalyticsHandler(self.database_handler, self.logger)
+        return self.analytics_handler
+
+    def get_export_handler(self):
+        """get the export handler, created on first use
+
+        Returns:
+            ExportHandler: the export handler
+        """
+        if self.export_handler is None:
+            from Export import ExportHandler
+            self.export_handler = ExportHandler(self.bot, self.database_handler, self.logger)
+        return self.export_handler
 
+    @property
+    def maintainer_chat_id(self):
+        return int(self.config_store.get('API', 'maintainer_chat_id'))
 
-        # testing - TO DELETE
-        # info = self.bot.sendMessage(self.maintainer_chat_id, 'testing custom keyboard',
-        #                               reply_markup = InlineKeyboardMarkup(inline_keyboard=[
-        #                                   [InlineKeyboardButton(text="One",callback_data='1'),
-        #                                   InlineKeyboardButton(text="Two",callback_data='2'),
-        #                                   InlineKeyboardButton(text="Three",callback_data='3')],
-        #                        ]
-        #                   ))
-        # self.messageID = info['message_id']
+    @property
+    def group_chat_id(self):
+        return int(self.config_store.get('API', 'group_chat_id'))
+
+    @property
+    def group_chat_id2(self):
+        return int(self.config_store.get('API', 'group_chat_id2'))
 
     def send_reminders(self):
-        """send reminders to all unsure players for games in 5/6/7/12 days
+        """send reminders to all unsure players for games in 4/5/6/13 days (REMINDER_WINDOWS)
+        every (player, game, reminder window) is recorded in the delivery ledger, so a re-run (after a restart or crash)
+        only sends the reminders not delivered yet
         """
         try:
             # get all unsure players and their respective games (they are unsure at)
             player_to_messages_map = self.scheduler_handler.load_schedules()
+            game_ids = {game[3] for games in player_to_messages_map.values() for (game, window) in games}
+            deliveries = self.database_handler.get_reminder_deliveries(list(game_ids))
         except NotifyAdminException as err:
             self.bot.sendMessage(self.maintainer_chat_id,
                                  f"loading schedules did not succeed - no scheduled messages today\n{err}")
-        else:
-            # loop through all pairs of players and game-strings
-            for player_chat_id, games in player_to_messages_map.items():
-                # assemble reminder text
-                reminder_text = "Hey, we still need to know whether you will play in the following games:\n"
-                button_list = [['continue later']]
-                for game in games:
-                    # add each pretty-printed game to reminder_text and button list
-                    game_info = f"{util.make_datetime_pretty_str(game[0])} | {game[2]}"
-                    reminder_text += f"{game_info}\n"
-                    button_list.append([game_info])
-                # assemble bot-reply (custom keyboard containing all games to still edit)
-                reply_keyboard = self.get_keyboard('reminder_games', -1, button_list=button_list)
+            return
+        sent_count = 0
+        skipped_count = 0
+        failed_count = 0
+        # loop through all pairs of players and game-strings
+        for player_chat_id, games in player_to_messages_map.items():
+            # drop reminders already delivered, or failed too often (e.g. the player blocked the bot)
+            pending_games = []
+            for (game, window) in games:
+                (status, attempts) = deliveries.get((player_chat_id, game[3], window), (None, 0))
+                if status != 'sent' and attempts < MAX_REMINDER_ATTEMPTS:
+                    pending_games.append((game, window))
+            if len(pending_games) == 0:
+                skipped_count += 1
+                continue
+            reminders = [(player_chat_id, game[3], window) for (game, window) in pending_games]
+            # assemble reminder text
+            reminder_text = "Hey, we still need to know whether you will play in the following games:\n"
+            button_list = [['continue later']]
+            for (game, window) in pending_games:
+                # add each pretty-printed game to reminder_text and button list
+                game_info = f"{util.make_datetime_pretty_str(game[0])} | {game[2]}"
+                reminder_text += f"{game_info}\n"
+                button_list.append([game_info])
+            # assemble bot-reply (custom keyboard containing all games to still edit)
+            reply_keyboard = self.get_keyboard('reminder_games', -1, button_list=button_list)
+            try:
                 self.bot.sendMessage(player_chat_id, reminder_text, reply_markup=reply_keyboard)
-                self.update_state_map(player_chat_id, 0)
+            except TelegramError as error:
+                failed_count += 1
+                self.logger.warning(f"reminder to {player_chat_id} failed: {error.description}")
+                self.record_reminders(reminders, 'failed', str(error.description)[:255])
+                continue
+            sent_count += 1
+            # record right after sending, a crash later in the loop does not resend this reminder
+            self.record_reminders(reminders, 'sent')
+            # the reply keyboard lists the games, the answer selects the game to edit
+            try:
+                self.update_user_state_map(player_chat_id, PlayerState.EDIT_CHOOSE_GAME)
+            except NotifyUserException:
+                self.logger.error(f"setting the state of {player_chat_id} after the reminder failed", exc_info=True)
+        self.logger.info(f"reminders: {sent_count} sent, {failed_count} failed, {skipped_count} already delivered")
+
+    def record_reminders(self, reminders: list, status: str, error: str = None):
+        """record reminders in the delivery ledger, notify admin on failure
+
+        Args:
+            reminders (list): (PlayerID, GameID, ReminderWindow) of the reminders sent in one message
+            status (str): 'sent' or 'failed'
+            error (str, optional): error of a failed send. Defaults to None.
+        """
+        try:
+            self.database_handler.record_reminder_deliveries(reminders, status, error)
+        except NotifyAdminException as err:
+            self.bot.sendMessage(self.maintainer_chat_id, f"recording reminders failed, they may be sent again\n{err}")
+
+    def sync_fixtures(self):
+        """pull the ics-feed of our fixtures and apply the changes to the database, notify admin on failure
+        """
+        try:
+            counts = self.fixture_sync_handler.sync()
+        except NotifyAdminException as err:
+            self.bot.sendMessage(self.maintainer_chat_id, f"fixture sync failed - games not updated\n{err}")
+        except Exception as err:
+            # runs in the main loop: an unexpected error must not take the bot down
+            self.logger.error("fixture sync failed", exc_info=True)
+            self.bot.sendMessage(self.maintainer_chat_id, f"fixture sync failed unexpectedly - games not updated\n{err}")
+        else:
+            if counts is not None and (counts['inserted'] > 0 or counts['updated'] > 0 or counts.get('deleted', 0) > 0
+                                       or counts['skipped'] > 0):
+                self.bot.sendMessage(self.maintainer_chat_id, f"fixture sync: {counts}")
+                # tell the players about moved games right away, not on the next check
+                if counts['updated'] > 0 and self.game_change_handler.is_enabled():
+                    self.game_change_handler.check()
+
+    def archive_games(self):
+        """move finished games to the archive, notify admin on failure
+        """
+        try:
+            self.database_handler.archive_games(self.config['Archive'].getint('keep_days', 1))
+        except NotifyAdminException as err:
+            self.bot.sendMessage(self.maintainer_chat_id, f"archiving games failed\n{err}")
 
     def handle(self, msg: dict):
         """Called each time a message is sent to the bot
@@ -182,7 +336,7 @@ class ZWTelegramBot(object):
             if chat_id in self.user_state_map.keys():
 
                 # chat_id allowed to use admin-commands:
-                is_admin = chat_id in self.admin_chat_ids
+                is_admin = self.identities.is_admin(chat_id)
 
                 try:
                     if content_type == 'text':
@@ -197,7 +351,7 @@ class ZWTelegramBot(object):
 
                             if command == '/start':
                                 # add player_chat_id to Database if not already added
-                                if not self.database_handler.player_present(chat_id):
+                                if not self.identities.is_player(chat_id):
                                     self.database_handler.insert_new_player(chat_id, first_name, last_name)
                                     self.update_user_state_map(chat_id, PlayerState.DEFAULT)
                                     # send reply
@@ -234,10 +388,76 @@ class ZWTelegramBot(object):
                                         reply_keyboard = self.get_keyboard('default', first_name, is_admin=is_admin)
                                     self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
                                     return
-                                elif command == '/get_player_stats':
-                                    reply_text = self.get_reply_text('player_stats', first_name, is_admin=is_admin)
+                                elif command.startswith('/retire ') or command.startswith('/unretire '):
+                                    # /retire <chat_id>: retired players are not listed as unsure anymore
+                                    split = command.split(' ')
+                                    retired = split[0] == '/retire'
+                                    player_chat_id = int(split[1]) if split[1].strip().isdigit() else -1
+                                    # user_state_map holds users in INIT as well, they are not in DataBase.Players
+                                    if self.identities.is_player(player_chat_id):
+                                        self.database_handler.update_player_retired(player_chat_id, retired)
+                                        self.user_state_map[player_chat_id].retired = retired
+                                        reply_text = f"{split[0][1:]}d {player_chat_id}"
+                                    else:
+                                        reply_text = f"no player with chat_id {split[1]}"
                                     reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
                                     self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+                                    return
+                                elif command == '/analytics':
+                                    # plain text: opponents and places are not escaped for MarkdownV2
+                                    from Export import iter_chunks
+                                    report = self.get_analytics_handler().get_report()
+                                    reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
+                                    # split into messages, the report grows with the roster
+                                    for reply_text in iter_chunks(report.splitlines(keepends=True)):
+                                        self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+                                    return
+                                elif command.startswith('/profile'):
+                                    # /profile updates <n>: cProfile the next n updates
+                                    # /profile memory <seconds>: tracemalloc over the next seconds
+                                    # /profile state: memory footprint of the in-memory state
+                                    # /profile startup: time spent per phase of the startup
+                                    split = command.split(' ')
+                                    if split[1:] == ['state']:
+                                        reply_text = self.get_state_footprint()
+                                    elif split[1:] == ['startup']:
+                                        reply_text = self.startup_timeline.get_report()
+                                    elif len(split) == 3 and split[1] in ['updates', 'memory'] and split[2].isdigit() \
+                                            and 0 < int(split[2]) <= 3600:
+                                        if split[1] == 'updates':
+                                            started = self.profiler_handler.start_profile(chat_id, int(split[2]))
+                                            reply_text = f"profiling, the report follows after {split[2]} updates"
+                                        else:
+                                            started = self.profiler_handler.start_memory(chat_id, int(split[2]))
+                                            reply_text = f"tracing, the report follows after {split[2]} seconds"
+                                        if not started:
+                                            reply_text = 'a session of this kind is already running'
+                                    else:
+                                        reply_text = 'usage: /profile updates <n>, /profile memory <seconds>, ' \
+                                                     '/profile state or /profile startup'
+                                    reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
+                                    self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+                                    return
+                                elif command.startswith('/export'):
+                                    # /export <players / spectators / attendance> [text]: csv file, or messages
+                                    from Export import EXPORT_KINDS
+                                    split = command.split(' ')
+                                    if len(split) in [2, 3] and split[1] in EXPORT_KINDS and split[2:] in [[], ['text']]:
+                                        if split[2:] == ['text']:
+                                            self.get_export_handler().send_messages(chat_id, split[1])
+                                        else:
+                                            self.get_export_handler().send_document(chat_id, split[1])
+                                    else:
+                                        reply_text = f"usage: /export <{' / '.join(EXPORT_KINDS)}> [text]"
+                                        reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
+                                        self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+                                    return
+                                elif command == '/get_player_stats':
+                                    # split into messages, a real roster is longer than one message
+                                    from Export import iter_chunks
+                                    reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
+                                    for reply_text in iter_chunks(self.database_handler.get_player_stats()):
+                                        self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
                                     reply_text = self.get_reply_text('get_playerState_Enum', first_name,
                                                                      is_admin=is_admin)
                                     reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
@@ -249,18 +469,22 @@ class ZWTelegramBot(object):
                                 self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
                                 return
                             elif command == '/edit_games':
-                                self.update_user_state_map(chat_id, PlayerState.EDIT_CHOOSE_GAME)
+                                # inline keyboard, edited in place by handle_callback_query, no state change needed
                                 reply_text = self.get_reply_text('edit_games', first_name)
-                                reply_keyboard = self.get_keyboard('overview_edit_games', chat_id)
+                                reply_keyboard = self.get_inline_keyboard('edit_games', chat_id)
                                 if reply_keyboard is None:
-                                    # there are no games in the future, reset State
-                                    self.update_user_state_map(chat_id, PlayerState.DEFAULT)
-                                    # Assemble reply
+                                    # there are no games in the future
                                     reply_text = self.get_reply_text('overview_no_games', first_name)
                                     reply_keyboard = self.get_keyboard('default', first_name, is_admin=is_admin)
                                 self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard,
                                                      parse_mode='MarkdownV2')
                                 return
+                            elif command == '/bulk_edit':
+                                self.update_user_state_map(chat_id, PlayerState.EDIT_BULK)
+                                reply_text = self.get_reply_text('bulk_edit', first_name)
+                                reply_keyboard = self.get_keyboard('bulk_edit', chat_id)
+                                self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+                                return
                             elif command == '/start':
                                 reply_text = self.get_reply_text('start', first_name)
                                 reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
@@ -286,6 +510,12 @@ class ZWTelegramBot(object):
                                     url='https://www.handball.ch/de/matchcenter/teams/36769')]])
                                 self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
                                 return
+                            elif command == '/calendar':
+                                reply_text = self.get_reply_text('calendar', first_name, chat_id=chat_id)
+                                reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
+                                self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard,
+                                                     disable_web_page_preview=True)
+                                return
                             else:
                                 self.handle_else(msg, chat_id)
                                 return
@@ -298,6 +528,11 @@ class ZWTelegramBot(object):
                                 reply_text = self.get_reply_text('continue later', first_name)
                                 reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
                                 self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+                            elif command in [PREVIOUS_PAGE, NEXT_PAGE]:
+                                reply_text = self.get_reply_text('stats_overview', first_name)
+                                reply_keyboard = self.get_keyboard('overview_stats', chat_id, page=command)
+                                self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard,
+                                                     parse_mode='MarkdownV2')
                             else:
                                 game_date = command[:18]
                                 current_game_id = self.database_handler.get_game_id(game_date)
@@ -306,7 +541,7 @@ class ZWTelegramBot(object):
                                     # assemble reply with select-keyboard
                                     reply_text = self.get_reply_text('stats',
                                                                      game_id=self.user_state_map[chat_id].game_number)
-                                    reply_keyboard = self.get_keyboard('overview_stats', chat_id)
+                                    reply_keyboard = self.get_keyboard('overview_stats', chat_id, page='current')
                                     self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard,
                                                          parse_mode='MarkdownV2')
                                 else:
@@ -347,6 +582,11 @@ class ZWTelegramBot(object):
                                     reply_text = self.get_reply_text('continue later', first_name)
                                     reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
                                     self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+                                elif command in [PREVIOUS_PAGE, NEXT_PAGE]:
+                                    reply_text = self.get_reply_text('edit_games', first_name)
+                                    reply_keyboard = self.get_keyboard('overview_edit_games', chat_id, page=command)
+                                    self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard,
+                                                         parse_mode='MarkdownV2')
                                 else:
                                     game_date = command[:18]
                                     current_game_id = self.database_handler.get_game_id(game_date)
@@ -391,6 +631,30 @@ class ZWTelegramBot(object):
                                 else:
                                     self.handle_else(msg, chat_id)
 
+                            elif current_state is PlayerState.EDIT_BULK:
+                                bulk_edit = util.parse_bulk_edit(command)
+                                if bulk_edit is not None:
+                                    (new_status, old_status, start, end) = bulk_edit
+                                    changed_games = self.database_handler.bulk_edit_game_attendance(
+                                        chat_id, new_status, old_status=old_status, start=start, end=end)
+                                    self.update_user_state_map(chat_id, PlayerState.DEFAULT)
+                                    # Assemble reply
+                                    reply_text = self.get_reply_text('bulk_edit_done', first_name,
+                                                                     changed_games=changed_games)
+                                    reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
+                                    self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+                                elif command == 'continue later':
+                                    self.update_user_state_map(chat_id, PlayerState.DEFAULT)
+                                    # Assemble reply
+                                    reply_text = self.get_reply_text('continue later', first_name)
+                                    reply_keyboard = self.get_keyboard('default', chat_id, is_admin=is_admin)
+                                    self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+                                else:
+                                    # not understood, show the options again
+                                    reply_text = self.get_reply_text('bulk_edit', first_name, mnu=True)
+                                    reply_keyboard = self.get_keyboard('bulk_edit', chat_id)
+                                    self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+
                         elif current_state.name.startswith('SPECTATOR'):
                             if current_state is PlayerState.SPECTATOR_CHOOSE_PENDING:
                                 split = command.split('|')
@@ -521,13 +785,20 @@ class ZWTelegramBot(object):
                                 reply_text = self.get_reply_text('continue later', first_name)
                                 reply_keyboard = self.get_keyboard('default', chat_id, is_spectator=True)
                                 self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard)
+                            elif command in [PREVIOUS_PAGE, NEXT_PAGE]:
+                                reply_text = self.get_reply_text('stats_overview', first_name, is_spectator=True)
+                                reply_keyboard = self.get_keyboard('overview_stats', chat_id, is_spectator=True,
+                                                                   page=command)
+                                self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard,
+                                                     parse_mode='MarkdownV2')
                             else:
                                 game_date = command[:18]
                                 current_game_id = self.database_handler.get_game_id(game_date)
                                 if current_game_id >= 0:
                                     # assemble reply with select-keyboard
                                     reply_text = self.get_reply_text('stats', game_id=current_game_id)
-                                    reply_keyboard = self.get_keyboard('overview_stats', chat_id, is_spectator=True)
+                                    reply_keyboard = self.get_keyboard('overview_stats', chat_id, is_spectator=True,
+                                                                       page='current')
                                     self.bot.sendMessage(chat_id, reply_text, reply_markup=reply_keyboard,
                                                          parse_mode='MarkdownV2')
                                 else:
@@ -582,9 +853,7 @@ class ZWTelegramBot(object):
                             # directly addressed at the bot, answer
                             command = command[23:]
                             if 'stats' in command:
-                                self.bot.sendMessage(chat_id,
-                                                     'The stats for our next game are:\n' + self.get_reply_text(
-                                                         'stats'), parse_mode='MarkdownV2')
+                                self.post_live_stats(reply_to_message_id=msg['message_id'])
 
                     else:
                         self.logger.info(f"Got {content_type} from Group-chat ({chat_id})")
@@ -625,7 +894,10 @@ class ZWTelegramBot(object):
             self.handle(msg)
 
     def handle_callback_query(self, msg: dict):
-        """handle callback queries - WORK IN PROGRESS
+        """handle callback queries of the inline keyboards, edit the message the keyboard belongs to in place
+        callback_data: 'list' (first page of the games), 'page|<previous / next>|<DateTime as unix time>|<game_id>'
+        (page of the games before / after the given game), 'game|<game_id>' (status buttons of a game),
+        'set|<game_id>|<status>' (change attendance, back to the games), 'close' (remove the keyboard)
 
         Args:
             msg (dict): parsed from reply-json of each message to bot
@@ -633,24 +905,163 @@ class ZWTelegramBot(object):
 
         query_id, from_id, query_data = telepot.glance(msg, flavor='callback_query')
         self.logger.info(f"Callback Query: {query_id}, {from_id}, {query_data}")
-        if int(query_data) < 4:
-            ikm = InlineKeyboardMarkup(
-                inline_keyboard=[[InlineKeyboardButton(text=f"blurb{query_data}", callback_data='4')]])
-            self.bot.editMessageReplyMarkup((from_id, self.messageID), reply_markup=ikm)
-        else:
-            self.bot.answerCallbackQuery(query_id, text='Got it')
+
+        if 'message' not in msg or from_id not in self.user_state_map or \
+                self.user_state_map[from_id].state is PlayerState.INIT:
+            self.bot.answerCallbackQuery(query_id, text='Not allowed')
+            return
+
+        first_name, last_name = get_names(msg)
+        message_identifier = telepot.message_identifier(msg['message'])
+        answer_text = None
+        try:
+            split = query_data.split('|')
+            if split[0] == 'game':
+                game_id = int(split[1])
+                # one query for the text and the keyboard
+                game = self.database_handler.get_game_with_status(game_id, from_id)
+                if game is None or game[0] <= datetime.datetime.now():
+                    # game does not exist (anymore) or is over (keyboard of an old message)
+                    reply_text = self.get_reply_text('edit_games', first_name, mnu=True)
+                    reply_keyboard = self.get_inline_keyboard('edit_games', from_id)
+                    self.edit_message(message_identifier, reply_text, reply_keyboard, parse_mode='MarkdownV2')
+                else:
+                    reply_text = self.get_reply_text('selection_game', game_id=game_id, chat_id=from_id, game=game)
+                    reply_keyboard = self.get_inline_keyboard('edit_game', from_id, game_id=game_id, game=game)
+                    self.edit_message(message_identifier, reply_text, reply_keyboard)
+            elif split[0] in ['set', 'list', 'page']:
+                page = None
+                if split[0] == 'set':
+                    new_status = util.translate_status_from_int(int(split[2]))
+                    game = self.database_handler.get_game_with_status(int(split[1]), from_id)
+                    if game is None or game[0] <= datetime.datetime.now():
+                        # keyboard of an old message: finished games can not be changed anymore
+                        answer_text = 'This game is over - the attendance can not be changed anymore'
+                    else:
+                        self.database_handler.edit_game_attendance(int(split[1]), new_status, from_id)
+                        answer_text = f"Saved: {new_status}"
+                elif split[0] == 'page' and split[1] in ['previous', 'next']:
+                    page = (split[1], datetime.datetime.fromtimestamp(int(split[2])), int(split[3]))
+                reply_text = self.get_reply_text('edit_games', first_name)
+                reply_keyboard = self.get_inline_keyboard('edit_games', from_id, page=page)
+                if reply_keyboard is None:
+                    reply_text = self.get_reply_text('overview_no_games', first_name)
+                self.edit_message(message_identifier, reply_text, reply_keyboard, parse_mode='MarkdownV2')
+            elif split[0] == 'close':
+                self.edit_message(message_identifier, self.get_reply_text('continue later', first_name))
+            else:
+                self.logger.warning(f"unknown callback_data {query_data}")
+        except NotifyUserException as nuException:
+            self.bot.sendMessage(self.maintainer_chat_id, f"Error in executing the following query:\n{nuException}")
+            answer_text = 'An error occurred - please try again in a few minutes'
+        except (ValueError, IndexError):
+            self.logger.warning(f"malformed callback_data {query_data}")
+        self.bot.answerCallbackQuery(query_id, text=answer_text)
+
+    def edit_message(self, message_identifier: tuple, text: str, inline_keyboard: InlineKeyboardMarkup = None,
+                     parse_mode: str = None):
+        """replace text and inline keyboard of a message sent by the bot
+
+        Args:
+            message_identifier (tuple): (chat_id, message_id) of the message to edit
+            text (str): new text of the message
+            inline_keyboard (InlineKeyboardMarkup, optional): new inline keyboard, None removes it. Defaults to None.
+            parse_mode (str, optional): parse_mode of the new text. Defaults to None.
+        """
+
+        try:
+            self.bot.editMessageText(message_identifier, text, parse_mode=parse_mode, reply_markup=inline_keyboard)
+        except TelegramError as err:
+            # e.g. 'message is not modified' if the same button was tapped twice
+            self.logger.info(f"editing message {message_identifier} failed: {err}")
 
     def start(self):
-        """attach handle() and handle_callback_query() to bot - message_loop
+        """attach handle() and handle_callback_query() to the update loop, start polling and the health endpoint
         """
-        self.bot.message_loop({'chat': self.handle, 'callback_query': self.handle_callback_query})
+        handlers = {'chat': self.profiler_handler.wrap(self.handle),
+                    'callback_query': self.profiler_handler.wrap(self.handle_callback_query)}
+        # journal of the updates: resume at the persisted offset, handle updates interrupted by a crash
+        # flood protection per sender (limits by role) and global, before any handler work
+        rate_limiter = RateLimiter(self.config, self.bot, self.identities, self.logger)
+        self.update_loop = UpdateLoop(self.bot, handlers, self.logger, journal=UpdateJournal(self.config, self.logger),
+                                      rate_limiter=rate_limiter)
+        self.update_loop.start()
+        self.health_handler.start()
+        if self.calendar_feed_handler.is_enabled():
+            self.calendar_feed_handler.start()
+        sd_notify('READY=1')
+        self.startup_timeline.mark('start polling')
         self.logger.info("Bot started")
+        self.logger.info(self.startup_timeline.get_report())
+
+    def replay(self, paths: list, speed: float = 0.0):
+        """replay journaled updates through the handlers (offline, with a DryRunBot and a copy of the database)
+
+        Args:
+            paths (list): journal files, oldest first
+            speed (float, optional): 1.0 keeps the original pace, 0 as fast as possible. Defaults to 0.0.
+
+        Returns:
+            str: summary of the replay
+        """
+        update_loop = UpdateLoop(self.bot, {'chat': self.handle, 'callback_query': self.handle_callback_query},
+                                 self.logger)
+        (count, handling_time) = replay_journal(paths, update_loop.dispatch, speed)
+        summary = f"replayed {count} updates in {handling_time:.2f}s " \
+                  f"({count / handling_time if handling_time > 0 else 0:.1f} updates/s)"
+        self.logger.info(summary)
+        return summary
+
+    def shutdown(self):
+        """graceful shutdown: stop intake, finish the updates being handled, close the database connection
+        scheduled jobs run in the main loop, so they are complete once shutdown() is called
+        """
+        self.logger.info("Shutting down")
+        sd_notify('STOPPING=1')
+        if self.update_loop is not None and not self.update_loop.stop():
+            self.logger.warning("update loop not drained in time")
+        # notifications about moved games are queued in a pool, send the queued ones
+        if not self.game_change_handler.stop():
+            self.logger.warning("notifications about moved games not sent in time")
+        self.health_handler.stop()
+        self.calendar_feed_handler.stop()
+        # every state change is committed when it happens, nothing else to flush
+        self.database_handler.close()
+        self.logger.info("Bot stopped")
+
+    def get_state_footprint(self):
+        """report the memory footprint of the state kept in memory, per structure and per entry
+
+        Returns:
+            str: the report
+        """
+
+        structures = [('user_state_map', self.user_state_map),
+                      ('spectator_state_map', self.spectator_state_map),
+                      ('player_chat_id_dict', self.database_handler.player_chat_id_dict),
+                      ('id_to_game', self.database_handler.id_to_game),
+                      ('game_stats', self.database_handler.game_stats.games)]
+        report = 'Memory footprint of the state:\n'
+        total = 0
+        # shared objects (e.g. interned names) are counted for the first structure referencing them
+        seen = set()
+        for (name, structure) in structures:
+            size = util.get_memory_footprint(structure, seen)
+            total += size
+            per_entry = size / len(structure) if len(structure) > 0 else 0
+            report += f"{name}: {size / 1024:.1f} KiB, {len(structure)} entries ({per_entry:.0f} B each)\n"
+        report += f"total: {total / 1024:.1f} KiB"
+        return report
 
     def get_reply_text(self, kind: str, first_name: str = None, is_admin: bool = False, game_id: int = -1,
-                       is_spectator: bool = False, mnu: bool = False):
+                       is_spectator: bool = False, mnu: bool = False, changed_games: int = 0, chat_id: int = -1,
+                       game: tuple = None):
         """Send appropriate reply text
 
         Args:
+            game (tuple, optional): the game (DateTime, Place, Adversary, status), queried by game_id if None
+            chat_id (int): the chat_id of the player, for replies including his status
+            changed_games (int): number of games changed by a bulk edit
             mnu (bool): MessageNotUnderstood: prepends the MNU message
             is_spectator: is the user a spectator or normal player
             game_id: the game id to get the status to
@@ -671,6 +1082,13 @@ class ZWTelegramBot(object):
         elif kind == 'await_approve':
             reply = f"Wait for the administrator to approve your status as spectator\\."
 
+        elif kind == 'bulk_edit':
+            reply = "Change your attendance for all upcoming games at once: choose an option below " \
+                    "or write a date range and the new status, e.g. 01.10.2020 - 31.10.2020 YES"
+
+        elif kind == 'bulk_edit_done':
+            reply = f"Done, {first_name} - changed your attendance for {changed_games} game(s)"
+
         elif kind == 'choose_pending_spectator':
             reply = f"Choose the pending spectator to approve or refuse\\."
 
@@ -678,12 +1096,20 @@ class ZWTelegramBot(object):
             if is_admin:
                 reply = f"Hi {first_name} - here are my available commands" \
                         f"\n/edit_games: lets you edit your games" \
+                        f"\n/bulk_edit: change your attendance for many games at once" \
                         f"\n/help: shows the list of available commands" \
                         f"\n/stats: shows the status for our next game" \
                         f"\n/add: add new game or Timekeeper event" \
                         f"\n/website: Returns the link for Handball.ch/Züri West" \
+                        f"\n/calendar: links to subscribe to our games in your calendar" \
                         f"\n/spectators: show the list of currently (pending) spectators of the bot" \
-                        f"\n/get_player_stats: dump the contents of the Players table"
+                        f"\n/get_player_stats: dump the contents of the Players table" \
+                        f"\n/export <players / spectators / attendance> [text]: export as csv file (or messages)" \
+                        f"\n/analytics: attendance statistics over all past games" \
+                        f"\n/profile updates <n>, /profile memory <seconds>: profile the bot (cProfile / tracemalloc)" \
+                        f"\n/profile state: memory footprint of the state kept in memory" \
+                        f"\n/profile startup: time spent per phase of the startup" \
+                        f"\n/retire <chat_id>, /unretire <chat_id>: change the retired flag of a player"
             elif is_spectator:
                 reply = f"Hi {first_name} - here are my available commands" \
                         f"\n/help: shows the list of available commands" \
@@ -692,9 +1118,11 @@ class ZWTelegramBot(object):
             else:
                 reply = f"Hi {first_name} - here are my available commands" \
                         f"\n/edit_games: lets you edit your games" \
+                        f"\n/bulk_edit: change your attendance for many games at once" \
                         f"\n/help: shows the list of available commands" \
                         f"\n/stats: shows the status for our next games" \
-                        f"\n/website: Returns the link for Handball.ch/Züri West"
+                        f"\n/website: Returns the link for Handball.ch/Züri West" \
+                        f"\n/calendar: links to subscribe to our games in your calendar"
 
         elif kind == 'init':
             reply = f"Please try again by clicking on /start\\!"
@@ -729,9 +1157,6 @@ class ZWTelegramBot(object):
             reply = f"Great, against whom will we play?" \
                     f"\n(write /cancel to cancel the process)"
 
-        elif kind == 'player_stats':
-            reply = self.database_handler.get_player_stats()
-
         elif kind == 'spectator_app_or_ref':
             reply = f"Do you want to approve or refuse {first_name}?"
 
@@ -774,9 +1199,26 @@ class ZWTelegramBot(object):
         elif kind == 'selection':
             reply = 'Will you be there (YES), be absent (NO) or are not sure yet (UNSURE)?'
 
+        elif kind == 'selection_game':
+            if game is None:
+                game = self.database_handler.get_game_with_status(game_id, chat_id)
+            if game is not None:
+                (DateTime, Place, Adversary, status) = game
+                reply = f"{util.pretty_print_game(DateTime, Place, status)}\nagainst {Adversary}" \
+                        f"\n\nWill you be there (YES), be absent (NO) or are not sure yet (UNSURE)?"
+
         elif kind == 'website':
             reply = 'Here it is:'
 
+        elif kind == 'calendar':
+            if self.calendar_feed_handler.is_enabled():
+                reply = f"Subscribe to these links in your calendar app, {first_name}:\n" \
+                        f"Our games with your attendance: {self.calendar_feed_handler.get_url(chat_id)}\n" \
+                        f"All games of the team: {self.calendar_feed_handler.get_url(TEAM_FEED)}\n" \
+                        f"The first link is personal, don't share it"
+            else:
+                reply = 'The calendar feeds are not available'
+
         elif kind == 'when':
             reply = 'Please indicate WHEN the event will take place' \
                     '\nDo this in the following format:' \
@@ -798,7 +1240,7 @@ class ZWTelegramBot(object):
         return reply
 
     def get_keyboard(self, kind: str, chat_id: int, button_list: list = None, is_admin: bool = False,
-                     is_spectator: bool = False):
+                     is_spectator: bool = False, page: str = None):
         """Get appropriate ReplyKeyboardMarkup
 
         Args:
@@ -807,6 +1249,7 @@ class ZWTelegramBot(object):
             chat_id (int): Telegram chat_id of the user the reply is sent to
             button_list (list, optional): [description]. Defaults to None.
             is_admin (bool, optional): is the person admin? (more possible commands)
+            page (str, optional): page of the game lists (overview_...), see get_game_list_page. Defaults to None.
 
         Raises:
             NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
@@ -822,17 +1265,22 @@ class ZWTelegramBot(object):
         elif kind == 'app_or_ref':
             keyboard = ReplyKeyboardMarkup(keyboard=[['Approve', 'Refuse'], ['continue later']],
                                            resize_keyboard=True)
+        elif kind == 'bulk_edit':
+            keyboard = ReplyKeyboardMarkup(keyboard=[['UNSURE -> YES', 'UNSURE -> NO'],
+                                                     ['ALL -> YES', 'ALL -> NO', 'ALL -> UNSURE'],
+                                                     ['continue later']],
+                                           resize_keyboard=True, one_time_keyboard=True)
         elif kind == 'default':
             if is_admin:
                 keyboard = ReplyKeyboardMarkup(
                     keyboard=[['/help', '/stats', '/edit_games'], ['/spectators', '/add', '/website'],
-                              ['/get_player_stats']],
+                              ['/get_player_stats', '/bulk_edit', '/analytics']],
                     resize_keyboard=True)
             elif is_spectator:
                 keyboard = ReplyKeyboardMarkup(keyboard=[['/help', '/website'], ['/games']],
                                                resize_keyboard=True)
             else:
-                keyboard = ReplyKeyboardMarkup(keyboard=[['/help', '/stats'], ['/edit_games', '/website']],
+                keyboard = ReplyKeyboardMarkup(keyboard=[['/help', '/stats'], ['/edit_games', '/bulk_edit'], ['/website']],
                                                resize_keyboard=True)
         elif kind == 'init':
             keyboard = ReplyKeyboardMarkup(keyboard=[['/start']], resize_keyboard=True)
@@ -842,16 +1290,19 @@ class ZWTelegramBot(object):
         elif kind.startswith('overview_'):
             try:
                 buttons = [['']]
+                page_keys = None
+                game_list_page = self.get_game_list_page(chat_id, page)
                 if kind == 'overview_edit_games':
-                    buttons = self.database_handler.get_games_list_with_status(chat_id)
+                    (buttons, page_keys) = self.database_handler.get_games_list_with_status(chat_id, game_list_page)
                 elif kind == 'overview_stats':
                     if is_spectator:
-                        buttons = self.database_handler.get_games_list_for_spectator()
+                        (buttons, page_keys) = self.database_handler.get_games_list_for_spectator(game_list_page)
                     else:
-                        buttons = self.database_handler.get_games_list_with_status_summary()
+                        (buttons, page_keys) = self.database_handler.get_games_list_with_status_summary(game_list_page)
             except NotifyUserException as nuException:
                 raise NotifyUserException(nuException)
             else:
+                self.game_list_pages[chat_id] = (game_list_page, page_keys)
                 if len(buttons) < 2:
                     # there are no games in the future
                     return None
@@ -871,6 +1322,84 @@ class ZWTelegramBot(object):
                                                        url='https://www.handball.ch/de/matchcenter/teams/32010')]])
         return keyboard
 
+    def get_game_list_page(self, chat_id: int, page: str = None):
+        """get the page of a game list to show, relative to the page shown last to chat_id
+
+        Args:
+            chat_id (int): Telegram chat_id of the user the game list is sent to
+            page (str, optional): PREVIOUS_PAGE, NEXT_PAGE or 'current' (the page shown last). Defaults to None (first page).
+
+        Returns:
+            tuple: the page for DatabaseHandler.get_games_page, None for the first page
+        """
+
+        if page is None or chat_id not in self.game_list_pages:
+            return None
+        (game_list_page, page_keys) = self.game_list_pages[chat_id]
+        if page == 'current' or page_keys is None:
+            return game_list_page
+        (first_key, last_key) = page_keys
+        if page == PREVIOUS_PAGE:
+            return ('previous',) + first_key
+        return ('next',) + last_key
+
+    def get_inline_keyboard(self, kind: str, chat_id: int, game_id: int = -1, page: tuple = None, game: tuple = None):
+        """Get appropriate InlineKeyboardMarkup, see handle_callback_query for the callback_data
+
+        Args:
+            kind (str): which keyboard, acts as switch value
+            chat_id (int): Telegram chat_id of the player the keyboard is for
+            game_id (int, optional): the game to show the status buttons for. Defaults to -1.
+            page (tuple, optional): page of the games, see DatabaseHandler.get_games_page. Defaults to None (first page).
+            game (tuple, optional): the game (DateTime, Place, Adversary, status), queried by game_id if None.
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+
+        Returns:
+            [telepot.InlineKeyboardMarkup]: the assembled keyboard, None = no games (in the future)
+        """
+
+        keyboard = None
+        if kind == 'edit_games':
+            # one button per game, showing the current status
+            buttons = []
+            (games, page_keys, page_buttons) = self.database_handler.get_games_with_status(chat_id, page)
+            for (ID, DateTime, Place, status) in games:
+                buttons.append([InlineKeyboardButton(text=util.pretty_print_game(DateTime, Place, status),
+                                                     callback_data=f"game|{ID}")])
+            if len(buttons) == 0:
+                return None
+            # the keys of the page travel in the callback_data: (DateTime as unix time, ID)
+            (first_key, last_key) = page_keys
+            navigation = []
+            for text in (page_buttons[0] if len(page_buttons) > 0 else []):
+                (direction, (DateTime, ID)) = ('previous', first_key) if text == PREVIOUS_PAGE else ('next', last_key)
+                navigation.append(InlineKeyboardButton(text=text,
+                                                       callback_data=f"page|{direction}|{int(DateTime.timestamp())}|{ID}"))
+            if len(navigation) > 0:
+                buttons.append(navigation)
+            buttons.append([InlineKeyboardButton(text='continue later', callback_data='close')])
+            keyboard = InlineKeyboardMarkup(inline_keyboard=buttons)
+        elif kind == 'edit_game':
+            if game is None:
+                game = self.database_handler.get_game_with_status(game_id, chat_id)
+            if game is None:
+                return None
+            current_status = game[3]
+            status_buttons = []
+            for status in [1, 2, 0]:
+                # mark the current status
+                text = util.translate_status_from_int(status)
+                if status == current_status:
+                    text = f"» {text} «"
+                status_buttons.append(InlineKeyboardButton(text=text, callback_data=f"set|{game_id}|{status}"))
+            keyboard = InlineKeyboardMarkup(inline_keyboard=[
+                status_buttons,
+                [InlineKeyboardButton(text='Overview', callback_data='list'),
+                 InlineKeyboardButton(text='continue later', callback_data='close')]])
+        return keyboard
+
     def update_user_state_map(self, chat_id: int, new_state: PlayerState):
         """update the state map in program-dict and database
 
@@ -928,9 +1457,29 @@ class ZWTelegramBot(object):
         """
         player_list = self.database_handler.get_games_in_exactly_x_days(4)
         if len(player_list) >= 1:
-            self.bot.sendMessage(self.group_chat_id,
-                                 'The stats for our next game are:\n' + self.get_reply_text('stats'),
-                                 parse_mode='MarkdownV2')
+            self.post_live_stats()
+
+    def post_live_stats(self, reply_to_message_id: int = None):
+        """post the live stats message of the next game to the group chat, if it is already posted,
+        bring it up to date and point to it instead of posting the stats again
+
+        Args:
+            reply_to_message_id (int, optional): message asking for the stats. Defaults to None.
+
+        Raises:
+            NotifyUserException: General Error to tell DataBase Access failed, user and admin will be notified
+        """
+
+        game_id = self.database_handler.get_next_game_id()
+        if game_id < 0:
+            self.bot.sendMessage(self.group_chat_id, 'There are no upcoming games\\!', parse_mode='MarkdownV2')
+            return
+        posted_message_id = self.live_stats_handler.get_message_id(game_id)
+        message_id = self.live_stats_handler.post(game_id)
+        if reply_to_message_id is not None and message_id == posted_message_id:
+            # no new message was posted, answer with a reply to the live message
+            self.bot.sendMessage(self.group_chat_id, 'The stats for our next game are kept up to date here',
+                                 reply_to_message_id=message_id)
 
 
 def init_logger(config: configparser.RawConfigParser):
@@ -961,19 +1510,22 @@ def main():
     complete logger
     Bot
     """
+    timeline = StartupTimeline(STARTUP_START)
+    timeline.mark('imports')
+
     # config File
     path = '/'.join((os.path.abspath(__file__).replace('\\', '/')).split('/')[:-1])
     config = configparser.RawConfigParser()
     config.read(os.path.join(path, 'config.ini'), encoding='utf8')
 
-    api_config = configparser.RawConfigParser()
-    api_config.read(os.path.join(path, 'api.ini'), encoding='utf8')
-
     db_config = configparser.RawConfigParser()
     db_config.read(os.path.join(path, 'db_config.ini'), encoding='utf8')
 
     zw_logger = init_logger(config)
 
+    # api.ini: secrets and admin_chat_ids, changeable at runtime
+    config_store = RuntimeConfigStore(os.path.join(path, 'api.ini'), zw_logger)
+
     # Logging
     logging_arguments = dict()
     logging_arguments["format"] = config['Logging']["format"]
@@ -982,15 +1534,40 @@ def main():
     if config["Logging"].getboolean("to_file"):
         logging_arguments["filename"] = config["Logging"]['logfile']
     logging.basicConfig(**logging_arguments)
+    timeline.mark('config')
+
+    if len(sys.argv) > 2 and sys.argv[1] == '--replay':
+        # python ZWTelegramBot.py --replay <speed> <journal>...: reproduce recorded load, nothing is sent to Telegram
+        # db_config.ini has to point to a copy of the database, the replayed updates change it
+        bot = ZWTelegramBot(config, config_store, db_config, zw_logger, dry_run=True)
+        print(bot.replay(sys.argv[3:], float(sys.argv[2])))
+        bot.database_handler.close()
+        return
 
     # Start botting
-    bot = ZWTelegramBot(config, api_config, db_config, zw_logger)
+    bot = ZWTelegramBot(config, config_store, db_config, zw_logger, timeline=timeline)
+
+    # stop gracefully on SIGTERM (bot.sh stop, systemd) and Ctrl-C
+    def request_shutdown(signum, frame):
+        bot.shutdown_event.set()
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
     bot.start()
 
-    while True:
+    # notify the systemd watchdog at least twice per WatchdogSec
+    watchdog_interval = get_watchdog_interval()
+    interval = 10 if watchdog_interval is None else min(10, watchdog_interval)
+    while not bot.shutdown_event.is_set():
         # run the scheduler_handler
         bot.scheduler_handler.run_schedule()
-        time.sleep(10)
+        bot.health_handler.tick()
+        if watchdog_interval is not None and all(bot.health_handler.check_live().values()):
+            sd_notify('WATCHDOG=1')
+        bot.shutdown_event.wait(interval)
+
+    bot.shutdown()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,10 @@
-from datetime import datetime
+from datetime import datetime, timedelta
+from enum import Enum
+import json
 import logging
+import os
+import re
+import sys
 
 # Final List of the possibilities for game attendance
 ATTENDANCE = ['UNSURE', 'YES', 'NO']
@@ -114,46 +119,45 @@ def pretty_print_game(DateTime: datetime, place: str, status: int = None):
         return f"{pretty_dateTime} | {place} | {pretty_status}"
 
 
-def is_member_of_group(status: str):
-    """check, whether a given status indicates group-association
+def parse_bulk_edit(command: str):
+    """parse a bulk-edit command of the form 'unsure -> yes', 'all -> no' or '01.10.2020 - 31.10.2020 yes'
 
     Args:
-        status (str): status to check
+        command (str): the (lower-case) command sent by the user
 
     Returns:
-        bool: is a person with status in this group?
+        (str, str, datetime, datetime): new status, old status (None = all), start and end of range (None = open), None if not parsable
     """
 
-    possibleStati = ['creator', 'administrator', 'member', 'restricted']
-    return status in possibleStati
+    match = re.fullmatch(r'\s*(all|unsure|yes|no)\s*->\s*(unsure|yes|no)\s*', command)
+    if match:
+        old_status = None if match.group(1) == 'all' else match.group(1).upper()
+        return match.group(2).upper(), old_status, None, None
 
+    match = re.fullmatch(r'\s*(\d{2}\.\d{2}\.\d{4})\s*-\s*(\d{2}\.\d{2}\.\d{4})\s+(unsure|yes|no)\s*', command)
+    if match:
+        try:
+            start = datetime.strptime(match.group(1), "%d.%m.%Y")
+            # the end date is inclusive
+            end = datetime.strptime(match.group(2), "%d.%m.%Y") + timedelta(days=1)
+        except ValueError:
+            return None
+        return match.group(3).upper(), None, start, end
+    return None
 
-def write_whitelist_to_file(user_whitelist: list):
-    """export user_whitelist to the api.ini file, so its initialized on the next restart 
+
+def is_member_of_group(status: str):
+    """check, whether a given status indicates group-association
 
     Args:
-        user_whitelist (list): list of int's representing the chat_id's of users
+        status (str): status to check
+
+    Returns:
+        bool: is a person with status in this group?
     """
 
-    with open("/home/pi/Desktop/ZW_Date_bot/src/api.ini", "r+") as file:
-        # read all lines
-        lines = file.readlines()
-        # place cursor at start of file
-        file.seek(0)
-        # loop over lines
-        for line in lines:
-            new_line = line
-            # leave all lines as they are, except we encountered the stored chat_ids
-            if line.startswith('user_whitelist = '):
-                # write new whitelist
-                new_line = 'user_whitelist = '
-                for user_id in user_whitelist:
-                    new_line += f"{str(user_id).strip()}, "
-                # get rid of last comma
-                new_line = new_line[:len(new_line) - 2] + '\n'
-            file.write(new_line)
-        # save new file (size)
-        file.truncate()
+    possibleStati = ['creator', 'administrator', 'member', 'restricted']
+    return status in possibleStati
 
 
 def game_string_to_datetime(game: str):
@@ -199,6 +203,14 @@ def sum_infos(info_list: list):
 
 
 def pretty_print_player_db(player_list):
+    """pretty print the rows of the Players table as aligned columns
+
+    Args:
+        player_list (list): rows (ID, LastName, FirstName, State, Retired)
+
+    Yields:
+        str: the lines of the dump, including the line terminator
+    """
     header_id = "ID"
     header_ln = "LastName"
     header_fn = "FirstName"
@@ -209,9 +221,9 @@ def pretty_print_player_db(player_list):
     len_fn = len(header_fn)
     len_state = len(header_state)
     len_ret = len(header_ret)
-    for (ID, fn, ln, state, ret) in player_list:
+    for (ID, ln, fn, state, ret) in player_list:
         len_id = max(len_id, len(str(ID)))
-        len_ln = max(len_fn, len(ln))
+        len_ln = max(len_ln, len(ln))
         len_fn = max(len_fn, len(fn))
         len_state = max(len_state, len(str(state)))
         len_ret = max(len_ret, len(str(ret)))
@@ -221,19 +233,18 @@ def pretty_print_player_db(player_list):
             return "  " * (l - len(string)) + string
         return string + "  " * (l - len(string))
 
-    res = "Database dump for Players\n"
-    res += f"{pad_it(header_id, len_id + 1)} " \
-           f"{pad_it(header_fn, len_fn + 1)} " \
-           f"{pad_it(header_ln, len_ln + 1)} " \
-           f"{pad_it(header_state, len_state + 1)} " \
-           f"{pad_it(header_ret, len_ret + 1)}\n\n"
-    for (ID, fn, ln, state, ret) in player_list:
-        res += f"{pad_it(str(ID), len_id + 1, True)} " \
-               f"{pad_it(fn, len_fn + 1)} " \
-               f"{pad_it(ln, len_ln + 1)} " \
-               f"{pad_it(str(state), len_state + 1, True)} " \
-               f"{pad_it(str(ret), len_ret + 1, True)}\n"
-    return res
+    yield "Database dump for Players\n"
+    yield f"{pad_it(header_id, len_id + 1)} " \
+          f"{pad_it(header_fn, len_fn + 1)} " \
+          f"{pad_it(header_ln, len_ln + 1)} " \
+          f"{pad_it(header_state, len_state + 1)} " \
+          f"{pad_it(header_ret, len_ret + 1)}\n\n"
+    for (ID, ln, fn, state, ret) in player_list:
+        yield f"{pad_it(str(ID), len_id + 1, True)} " \
+              f"{pad_it(fn, len_fn + 1)} " \
+              f"{pad_it(ln, len_ln + 1)} " \
+              f"{pad_it(str(state), len_state + 1, True)} " \
+              f"{pad_it(str(ret), len_ret + 1, True)}\n"
 
 
 def pretty_print_player_states():
@@ -243,3 +254,72 @@ def pretty_print_player_states():
             if line.startswith("    ") and not line.startswith("     "):
                 res += line
     return res
+
+
+def get_memory_footprint(obj, seen: set = None):
+    """deep size of an object in bytes: the object and everything reachable through containers, __dict__ and __slots__
+    shared objects (interned strings, small ints) are counted once, classes and enum members not at all
+
+    Args:
+        obj (object): the object to measure, e.g. the user_state_map
+        seen (set, optional): ids of the objects already counted. Defaults to None.
+
+    Returns:
+        int: size in bytes
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, (type, Enum)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(get_memory_footprint(key, seen) + get_memory_footprint(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(get_memory_footprint(item, seen) for item in obj)
+    else:
+        if hasattr(obj, '__dict__'):
+            size += get_memory_footprint(obj.__dict__, seen)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                size += get_memory_footprint(getattr(obj, slot), seen)
+    return size
+
+
+def load_json_state(path: str, _logger: logging.Logger):
+    """load a state file written by save_json_state
+
+    Args:
+        path (str): path to the state file
+        _logger (logging.Logger): logger instance, logs an unreadable file
+
+    Returns:
+        object: the parsed state, None if there is no state file yet or it can not be read
+    """
+
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        _logger.warning(f"could not read {path}", exc_info=True)
+        return None
+
+
+def save_json_state(path: str, state, _logger: logging.Logger):
+    """persist a state as json: write to a temporary file, then rename, so a crash never leaves a half-written file
+
+    Args:
+        path (str): path to the state file
+        state (object): the state, json serializable
+        _logger (logging.Logger): logger instance, logs a failed write
+    """
+
+    temp_file = path + '.tmp'
+    try:
+        with open(temp_file, 'w') as file:
+            json.dump(state, file)
+        os.replace(temp_file, path)
+    except OSError:
+        _logger.warning(f"could not write {path}", exc_info=True)